@@ -16,89 +16,167 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
-from mathutils import Vector
-
-from . import utils
-
-
-def generate_tree(aabb_tree, face_list, rlevel=0):
-    if rlevel > 128:
-        raise ValueError("rlevel must not exceed 128, but is equal to {}".format(rlevel))
-
-    if not face_list:
-        raise ValueError("face_list must not be empty")
-
-    # Calculate bounding box min/max and centroid
-    bb_min = Vector((100000.0, 100000.0, 100000.0))
-    bb_max = Vector((-100000.0, -100000.0, -100000.0))
-    bb_centroid = Vector()
-    for face in face_list:
-        face_verts = face[1]
-        for vert in face_verts:
-            for axis in range(3):
-                if bb_min[axis] > vert[axis]:
-                    bb_min[axis] = vert[axis]
-                if bb_max[axis] < vert[axis]:
-                    bb_max[axis] = vert[axis]
-        face_centroid = face[2]
-        bb_centroid = bb_centroid + face_centroid
-    bb_centroid = bb_centroid / len(face_list)
-
-    # Only one face left - this node is a leaf
-    if len(face_list) == 1:
-        face_idx = face_list[0][0]
-        aabb_tree.append([*bb_min[:3], *bb_max[:3], -1, -1, face_idx, 0])
-        return
+import hashlib
+
+import numpy as np
+
+from .defines import AabbSplit
+
+MAX_EXTENT = 100000.0
+
+
+class AabbTreeCache:
+    def __init__(self):
+        self.trees = dict()
+
+    def get_tree(self, verts, faces, split=AabbSplit.CENTROID):
+        key = get_tree_key(verts, faces, split)
+        if key not in self.trees:
+            self.trees[key] = generate_tree(verts, faces, split)
+        return self.trees[key]
+
+
+def get_tree_key(verts, faces, split):
+    digest = hashlib.sha1(split.encode("utf-8"))
+    digest.update(np.asarray(verts, dtype=np.float64).tobytes())
+    digest.update(np.asarray(faces, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def generate_tree(verts, faces, split=AabbSplit.CENTROID):
+    if len(faces) == 0:
+        raise ValueError("faces must not be empty")
+
+    face_verts = np.asarray(verts, dtype=np.float64)[np.asarray(faces, dtype=np.int64)]
+    face_min = face_verts.min(axis=1)
+    face_max = face_verts.max(axis=1)
+    centroids = face_verts.sum(axis=1) / 3
+
+    # Nodes are emitted depth-first, left subtree before right subtree. Stack
+    # entries are face indices along with the parent node and its child slot.
+    aabb_tree = []
+    stack = [(np.arange(len(faces)), None, 0)]
+    while stack:
+        face_indices, parent, child_slot = stack.pop()
+        if parent is not None:
+            parent[child_slot] = len(aabb_tree)
+
+        bb_min = np.minimum(face_min[face_indices].min(axis=0), MAX_EXTENT)
+        bb_max = np.maximum(face_max[face_indices].max(axis=0), -MAX_EXTENT)
+
+        # Only one face left - this node is a leaf
+        if len(face_indices) == 1:
+            aabb_tree.append([*bb_min.tolist(), *bb_max.tolist(), -1, -1, int(face_indices[0]), 0])
+            continue
+
+        if split == AabbSplit.SAH:
+            split_axis, left, right = split_by_surface_area(face_min[face_indices],
+                                                            face_max[face_indices],
+                                                            centroids[face_indices])
+        else:
+            split_axis, left, right = split_by_centroid(centroids[face_indices], bb_min, bb_max)
+
+        node = [*bb_min.tolist(), *bb_max.tolist(), 0, 0, -1, 1 + split_axis]
+        aabb_tree.append(node)
+        stack.append((face_indices[right], node, 7))
+        stack.append((face_indices[left], node, 6))
+
+    return aabb_tree
+
+
+def refit_tree(aabb_tree, verts, faces, new_face_by_old_face):
+    face_verts = np.asarray(verts, dtype=np.float64)[np.asarray(faces, dtype=np.int64)]
+    face_min = np.minimum(face_verts.min(axis=1), MAX_EXTENT).tolist()
+    face_max = np.maximum(face_verts.max(axis=1), -MAX_EXTENT).tolist()
+
+    # Children always follow their parent, so refitting in reverse order
+    # visits both children of a node before the node itself
+    refitted = [None] * len(aabb_tree)
+    for node_idx in reversed(range(len(aabb_tree))):
+        node = aabb_tree[node_idx]
+        child_idx1, child_idx2, face_idx = node[6:9]
+        if face_idx != -1:
+            face_idx = new_face_by_old_face[face_idx]
+            bb_min = face_min[face_idx]
+            bb_max = face_max[face_idx]
+        else:
+            child1 = refitted[child_idx1]
+            child2 = refitted[child_idx2]
+            bb_min = [min(child1[i], child2[i]) for i in range(3)]
+            bb_max = [max(child1[3 + i], child2[3 + i]) for i in range(3)]
+        refitted[node_idx] = [*bb_min, *bb_max, child_idx1, child_idx2, face_idx, node[9]]
+
+    return refitted
+
+
+def is_tree_valid(aabb_tree, num_faces):
+    face_indices = []
+    for node_idx, node in enumerate(aabb_tree):
+        child_idx1, child_idx2, face_idx = node[6:9]
+        if face_idx == -1:
+            # Children must follow their parent, as refit_tree relies on it
+            if not (node_idx < child_idx1 < len(aabb_tree) and node_idx < child_idx2 < len(aabb_tree)):
+                return False
+        else:
+            face_indices.append(face_idx)
+    return sorted(face_indices) == list(range(num_faces))
+
+
+def split_by_centroid(centroids, bb_min, bb_max):
+    bb_centroid = centroids.sum(axis=0) / len(centroids)
 
     # Find longest axis
     bb_size = bb_max - bb_min
-    if bb_size.y > bb_size.x and bb_size.y > bb_size.z:
+    if bb_size[1] > bb_size[0] and bb_size[1] > bb_size[2]:
         split_axis = 1
-    elif bb_size.z > bb_size.x and bb_size.z > bb_size.y:
+    elif bb_size[2] > bb_size[0] and bb_size[2] > bb_size[1]:
         split_axis = 2
     else:
         split_axis = 0
 
     # Change axis in case points are coplanar with the split plane
-    change_axis = True
-    for face in face_list:
-        face_centroid = face[2]
-        change_axis = change_axis and utils.is_close(face_centroid[split_axis], bb_centroid[split_axis], 1e-4)
-    if change_axis:
-        split_axis += 1
-        if split_axis == 3:
-            split_axis = 0
+    values = centroids[:, split_axis]
+    mean = bb_centroid[split_axis]
+    if np.all(np.abs(values - mean) <= 1e-4 * np.maximum(np.abs(values), abs(mean))):
+        split_axis = (split_axis + 1) % 3
 
     # Put faces on the left and right side of the split plane into separate
     # lists. Try all axises to prevent tree degeneration.
-    face_list_left = []
-    face_list_right = []
-    for i in range(0, 4):
-        if i == 3:
-            raise RuntimeError("Generated tree is degenerate")
-
-        # Sort faces by side
-        face_list_left = []
-        face_list_right = []
-        for face in face_list:
-            face_centroid = face[2]
-            if face_centroid[split_axis] < bb_centroid[split_axis]:
-                face_list_left.append(face)
-            else:
-                face_list_right.append(face)
-
-        # Neither list is empty, this split will do just fine
-        if face_list_left and face_list_right:
-            break
-
-        # At least one of the lists is empty - try another axis
-        split_axis += 1
-        if split_axis == 3:
-            split_axis = 0
-
-    node = [*bb_min[:3], *bb_max[:3], 0, 0, -1, 1 + split_axis]
-    aabb_tree.append(node)
-    node[6] = len(aabb_tree)
-    generate_tree(aabb_tree, face_list_left, rlevel+1)
-    node[7] = len(aabb_tree)
-    generate_tree(aabb_tree, face_list_right, rlevel+1)
+    for _ in range(3):
+        left = centroids[:, split_axis] < bb_centroid[split_axis]
+        if left.any() and not left.all():
+            return split_axis, left, ~left
+        split_axis = (split_axis + 1) % 3
+
+    # All centroids coincide - split faces in half to keep the tree balanced
+    left = np.arange(len(centroids)) < len(centroids) // 2
+    return split_axis, left, ~left
+
+
+def split_by_surface_area(face_min, face_max, centroids):
+    num_faces = len(centroids)
+    num_left = np.arange(1, num_faces)
+    best = None
+    for axis in range(3):
+        order = np.argsort(centroids[:, axis], kind="stable")
+        sorted_min = face_min[order]
+        sorted_max = face_max[order]
+        left_area = get_surface_area(np.minimum.accumulate(sorted_min)[:-1],
+                                     np.maximum.accumulate(sorted_max)[:-1])
+        right_area = get_surface_area(np.minimum.accumulate(sorted_min[::-1])[::-1][1:],
+                                      np.maximum.accumulate(sorted_max[::-1])[::-1][1:])
+        costs = left_area * num_left + right_area * (num_faces - num_left)
+
+        # Prefer the most balanced split among equally good ones, so that flat
+        # or degenerate geometry does not produce a linear tree
+        candidates = np.flatnonzero(costs == costs.min())
+        split_idx = candidates[np.argmin(np.abs(2 * num_left[candidates] - num_faces))]
+        if best is None or costs[split_idx] < best[0]:
+            best = (costs[split_idx], axis, order[:split_idx + 1], order[split_idx + 1:])
+
+    return best[1:]
+
+
+def get_surface_area(bb_min, bb_max):
+    size = bb_max - bb_min
+    return size[:, 0] * size[:, 1] + size[:, 1] * size[:, 2] + size[:, 2] * size[:, 0]
@@ -0,0 +1,60 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+def find_adjacent_edges(faces):
+    # Map every edge, as a sorted pair of vertex indices, to the faces that
+    # contain it in face order, storing the first matching edge of each face
+    edge_keys = []
+    faces_by_edge = dict()
+    positions = []
+    for face_idx, face in enumerate(faces):
+        keys = [tuple(sorted(edge)) for edge in [(face[0], face[1]),
+                                                 (face[1], face[2]),
+                                                 (face[2], face[0])]]
+        face_positions = []
+        for edge_idx, key in enumerate(keys):
+            if key in faces_by_edge:
+                shared = faces_by_edge[key]
+            else:
+                shared = faces_by_edge[key] = []
+            if not shared or shared[-1][0] != face_idx:
+                shared.append((face_idx, edge_idx))
+            face_positions.append(len(shared) - 1)
+        edge_keys.append(keys)
+        positions.append(face_positions)
+
+    # Edge is adjacent to the first edge of the next face that shares it,
+    # unless it has already been claimed by a preceding face
+    adjacent_edges = [[-1, -1, -1] for _ in range(len(faces))]
+    for face_idx, keys in enumerate(edge_keys):
+        for edge_idx, key in enumerate(keys):
+            if adjacent_edges[face_idx][edge_idx] != -1:
+                continue
+            shared = faces_by_edge[key]
+            next_position = positions[face_idx][edge_idx] + 1
+            if next_position == len(shared):
+                continue
+            other_face_idx, other_edge_idx = shared[next_position]
+            adjacent_edges[face_idx][edge_idx] = 3 * other_face_idx + other_edge_idx
+            adjacent_edges[other_face_idx][other_edge_idx] = 3 * face_idx + edge_idx
+
+    return adjacent_edges
+
+
+def find_adjacent_faces(faces):
+    return [[edge // 3 if edge != -1 else -1 for edge in edges] for edges in find_adjacent_edges(faces)]
@@ -141,10 +141,16 @@ class NormalsAlgorithm:
     SHARP_EDGES = "SHARP_EDGES"
 
 
+class AabbSplit:
+    CENTROID = "CENTROID"
+    SAH = "SAH"
+
+
 class ImportOptions:
     def __init__(self):
         self.import_geometry = True
         self.import_animations = True
+        self.animation_filter = []
         self.import_walkmeshes = True
         self.build_materials = True
         self.build_armature = False
@@ -160,3 +166,4 @@ class ExportOptions:
         self.export_animations = True
         self.export_walkmeshes = True
         self.export_custom_normals = True
+        self.aabb_split = AabbSplit.CENTROID
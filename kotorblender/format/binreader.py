@@ -21,68 +21,102 @@ import struct
 
 class BinaryReader:
     def __init__(self, path, byteorder):
-        self.file = open(path, "rb")
+        with open(path, "rb") as file:
+            self.buffer = file.read()
         self.byteorder = byteorder
+        self.bo_literal = '>' if byteorder == 'big' else '<'
+        self.position = 0
 
-    def __del__(self):
-        self.file.close()
+        self.int8 = self.new_record("b")
+        self.int16 = self.new_record("h")
+        self.int32 = self.new_record("i")
+        self.uint8 = self.new_record("B")
+        self.uint16 = self.new_record("H")
+        self.uint32 = self.new_record("I")
+        self.float = self.new_record("f")
+
+    def new_record(self, fmt):
+        return struct.Struct(self.bo_literal + fmt)
 
     def seek(self, offset):
-        self.file.seek(offset)
+        self.position = offset
 
     def skip(self, offset):
-        self.file.seek(offset, 1)
+        self.position += offset
 
     def tell(self):
-        return self.file.tell()
+        return self.position
+
+    def get_record(self, record):
+        values = record.unpack_from(self.buffer, self.position)
+        self.position += record.size
+        return values
+
+    def get_records(self, record, count):
+        start = self.position
+        self.position += record.size * count
+        return list(record.iter_unpack(self.buffer[start:self.position]))
 
     def get_int8(self):
-        return int.from_bytes(self.file.read(1), self.byteorder, signed=True)
+        return self.get_record(self.int8)[0]
 
     def get_int16(self):
-        return int.from_bytes(self.file.read(2), self.byteorder, signed=True)
+        return self.get_record(self.int16)[0]
 
     def get_int32(self):
-        return int.from_bytes(self.file.read(4), self.byteorder, signed=True)
+        return self.get_record(self.int32)[0]
 
     def get_uint8(self):
-        return int.from_bytes(self.file.read(1), self.byteorder, signed=False)
+        return self.get_record(self.uint8)[0]
 
     def get_uint16(self):
-        return int.from_bytes(self.file.read(2), self.byteorder, signed=False)
+        return self.get_record(self.uint16)[0]
 
     def get_uint32(self):
-        return int.from_bytes(self.file.read(4), self.byteorder, signed=False)
+        return self.get_record(self.uint32)[0]
 
     def get_float(self):
-        bo_literal = '>' if self.byteorder == 'big' else '<'
-        [val] = struct.unpack(bo_literal + "f", self.file.read(4))
-        return val
+        return self.get_record(self.float)[0]
+
+    def get_int16s(self, count):
+        return self.get_array("h", count)
+
+    def get_int32s(self, count):
+        return self.get_array("i", count)
+
+    def get_uint16s(self, count):
+        return self.get_array("H", count)
+
+    def get_uint32s(self, count):
+        return self.get_array("I", count)
+
+    def get_floats(self, count):
+        return self.get_array("f", count)
+
+    def get_array(self, fmt, count):
+        values = struct.unpack_from("{}{}{}".format(self.bo_literal, count, fmt), self.buffer, self.position)
+        self.position += struct.calcsize(fmt) * count
+        return list(values)
 
     def get_string(self, len):
-        return self.file.read(len).decode("utf-8")
+        return self.get_bytes(len).decode("utf-8")
 
     def get_c_string(self):
-        str = ""
-        while True:
-            ch = self.file.read(1).decode("utf-8")
-            if ch == '\0':
-                break
-            str += ch
+        end = self.buffer.find(b'\0', self.position)
+        if end == -1:
+            end = len(self.buffer)
+        str = self.buffer[self.position:end].decode("utf-8")
+        self.position = end + 1
         return str
 
     def get_c_string_up_to(self, max_len):
-        str = ""
-        len = max_len
-        while len > 0:
-            ch = self.file.read(1).decode("utf-8")
-            len -= 1
-            if ch == '\0':
-                break
-            str += ch
-        if len > 0:
-            self.file.seek(len, 1)
-        return str
+        chunk = self.get_bytes(max_len)
+        end = chunk.find(b'\0')
+        if end != -1:
+            chunk = chunk[:end]
+        return chunk.decode("utf-8")
 
     def get_bytes(self, count):
-        return self.file.read(count)
+        start = self.position
+        self.position += count
+        return self.buffer[start:self.position]
@@ -18,45 +18,86 @@
 
 import struct
 
+import numpy as np
+
 
 class BinaryWriter:
     def __init__(self, path, byteorder):
-        self.file = open(path, "wb")
+        self.path = path
         self.byteorder = byteorder
+        self.bo_literal = '>' if byteorder == 'big' else '<'
+        self.buffer = bytearray()
+
+        self.int8 = self.new_record("b")
+        self.int16 = self.new_record("h")
+        self.int32 = self.new_record("i")
+        self.uint8 = self.new_record("B")
+        self.uint16 = self.new_record("H")
+        self.uint32 = self.new_record("I")
+        self.float = self.new_record("f")
+
+    def new_record(self, fmt):
+        return struct.Struct(self.bo_literal + fmt)
 
-    def __del__(self):
-        self.file.close()
+    def save(self):
+        with open(self.path, "wb") as file:
+            file.write(self.buffer)
 
     def tell(self):
-        return self.tell()
+        return len(self.buffer)
+
+    def put_record(self, record, *values):
+        self.buffer += record.pack(*values)
+
+    def put_records(self, record, rows):
+        for values in rows:
+            self.buffer += record.pack(*values)
 
     def put_int8(self, val):
-        self.file.write(val.to_bytes(1, byteorder=self.byteorder, signed=True))
+        self.put_record(self.int8, val)
 
     def put_int16(self, val):
-        self.file.write(val.to_bytes(2, byteorder=self.byteorder, signed=True))
+        self.put_record(self.int16, val)
 
     def put_int32(self, val):
-        self.file.write(val.to_bytes(4, byteorder=self.byteorder, signed=True))
+        self.put_record(self.int32, val)
 
     def put_uint8(self, val):
-        self.file.write(val.to_bytes(1, byteorder=self.byteorder, signed=False))
+        self.put_record(self.uint8, val)
 
     def put_uint16(self, val):
-        self.file.write(val.to_bytes(2, byteorder=self.byteorder, signed=False))
+        self.put_record(self.uint16, val)
 
     def put_uint32(self, val):
-        self.file.write(val.to_bytes(4, byteorder=self.byteorder, signed=False))
+        self.put_record(self.uint32, val)
 
     def put_float(self, val):
-        bo_literal = '>' if self.byteorder == 'big' else '<'
-        self.file.write(struct.pack(bo_literal + "f", val))
+        self.put_record(self.float, val)
+
+    def put_int32s(self, values):
+        self.put_array("i", values)
+
+    def put_uint16s(self, values):
+        self.put_array("H", values)
+
+    def put_uint32s(self, values):
+        self.put_array("I", values)
+
+    def put_floats(self, values):
+        self.put_array("f", values)
+
+    def put_array(self, fmt, values):
+        if isinstance(values, np.ndarray):
+            self.buffer += values.astype(self.bo_literal + fmt).tobytes()
+            return
+        values = list(values)
+        self.buffer += struct.pack("{}{}{}".format(self.bo_literal, len(values), fmt), *values)
 
     def put_string(self, val):
-        self.file.write(val.encode("utf-8"))
+        self.buffer += val.encode("utf-8")
 
     def put_c_string(self, val):
-        self.file.write((val + '\0').encode("utf-8"))
+        self.buffer += (val + '\0').encode("utf-8")
 
     def put_bytes(self, bytes):
-        self.file.write(bytes)
+        self.buffer += bytes
@@ -16,6 +16,8 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import numpy as np
+
 from ...defines import DummyType, RootType, WalkmeshType
 from ...scene.modelnode.aabb import AabbNode
 from ...scene.modelnode.dummy import DummyNode
@@ -34,7 +36,7 @@ class BwmLoader:
         self.bwm = BinaryReader(path, 'little')
 
         self.position = [0.0] * 3
-        self.verts = []
+        self.verts = np.zeros((0, 3))
         self.facelist = FaceList()
         self.outer_edges = []
 
@@ -56,11 +58,11 @@ class BwmLoader:
 
         version = self.bwm.get_string(4)
         self.bwm_type = self.bwm.get_uint32()
-        self.rel_use_vec1 = [self.bwm.get_float() for _ in range(3)]
-        self.rel_use_vec2 = [self.bwm.get_float() for _ in range(3)]
-        abs_use_vec1 = [self.bwm.get_float() for _ in range(3)]
-        abs_use_vec2 = [self.bwm.get_float() for _ in range(3)]
-        self.position = [self.bwm.get_float() for _ in range(3)]
+        self.rel_use_vec1 = self.bwm.get_floats(3)
+        self.rel_use_vec2 = self.bwm.get_floats(3)
+        abs_use_vec1 = self.bwm.get_floats(3)
+        abs_use_vec2 = self.bwm.get_floats(3)
+        self.position = self.bwm.get_floats(3)
         self.num_verts = self.bwm.get_uint32()
         self.off_verts = self.bwm.get_uint32()
         self.num_faces = self.bwm.get_uint32()
@@ -80,61 +82,44 @@ class BwmLoader:
 
     def load_vertices(self):
         self.bwm.seek(self.off_verts)
-        for _ in range(self.num_verts):
-            vert = [self.bwm.get_float() - self.position[i] for i in range(3)]
-            self.verts.append(vert)
+        values = self.bwm.get_floats(3 * self.num_verts)
+        self.verts = np.reshape(values, (-1, 3)) - self.position
 
     def load_faces(self):
-        vert_indices = []
         self.bwm.seek(self.off_vert_indices)
-        for _ in range(self.num_faces):
-            vert_indices.append([self.bwm.get_uint32() for _ in range(3)])
+        self.facelist.vertices = self.bwm.get_uint32s(3 * self.num_faces)
 
         self.bwm.seek(self.off_material_ids)
-        material_ids = [self.bwm.get_uint32() for _ in range(self.num_faces)]
+        self.facelist.materials = self.bwm.get_uint32s(self.num_faces)
 
-        normals = []
         self.bwm.seek(self.off_normals)
-        for _ in range(self.num_faces):
-            normal = [self.bwm.get_float() for _ in range(3)]
-            normals.append(normal)
+        self.facelist.normals = self.bwm.get_floats(3 * self.num_faces)
 
         self.bwm.seek(self.off_distances)
-        distances = [self.bwm.get_float() for _ in range(self.num_faces)]
-
-        for i in range(self.num_faces):
-            self.facelist.vertices.append(vert_indices[i])
-            self.facelist.uv.append([0] * 3)
-            self.facelist.materials.append(material_ids[i])
+        distances = self.bwm.get_floats(self.num_faces)
 
     def load_aabbs(self):
         aabbs = []
         self.bwm.seek(self.off_aabbs)
-        for _ in range(self.num_aabbs):
-            bounding_box = [self.bwm.get_float() for _ in range(6)]
-            face_idx = self.bwm.get_int32()
-            self.bwm.skip(4)  # unknown
-            most_significant_plane = self.bwm.get_uint32()
-            child_idx1 = self.bwm.get_uint32()
-            child_idx2 = self.bwm.get_uint32()
+        record = self.bwm.new_record("6fi4xIII")
+        for values in self.bwm.get_records(record, self.num_aabbs):
+            bounding_box = list(values[:6])
+            face_idx, most_significant_plane, child_idx1, child_idx2 = values[6:]
             aabbs.append(AABB(bounding_box, face_idx, most_significant_plane, child_idx1, child_idx2))
 
     def load_adjacent_edges(self):
-        adj_edges = []
         self.bwm.seek(self.off_adj_edges)
-        for _ in range(self.num_adj_edges):
-            adj_edges.append([self.bwm.get_int32() for _ in range(3)])
+        values = self.bwm.get_int32s(3 * self.num_adj_edges)
+        adj_edges = [values[3*i:3*i+3] for i in range(self.num_adj_edges)]
 
     def load_outer_edges(self):
         self.bwm.seek(self.off_outer_edges)
-        for _ in range(self.num_outer_edges):
-            index = self.bwm.get_uint32()
-            transition = self.bwm.get_int32()
-            self.outer_edges.append((index, transition))
+        record = self.bwm.new_record("Ii")
+        self.outer_edges = self.bwm.get_records(record, self.num_outer_edges)
 
     def load_perimeters(self):
         self.bwm.seek(self.off_perimeters)
-        self.perimeters = [self.bwm.get_uint32() for _ in range(self.num_perimeters)]
+        self.perimeters = self.bwm.get_uint32s(self.num_perimeters)
 
     def new_walkmesh(self):
         if self.bwm_type == BWM_TYPE_WOK:
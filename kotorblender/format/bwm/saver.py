@@ -16,14 +16,16 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import numpy as np
+
 from mathutils import Vector
 
-from ...defines import DummyType, WalkmeshMaterial, WalkmeshType
+from ...defines import AabbSplit, DummyType, WalkmeshMaterial, WalkmeshType
 from ...scene.modelnode.aabb import AabbNode
 from ...scene.modelnode.dummy import DummyNode
 from ...scene.modelnode.trimesh import FaceList
 
-from ... import aabb, utils
+from ... import aabb, adjacency, utils
 
 from ..binwriter import BinaryWriter
 from ..mdl.types import *
@@ -34,10 +36,12 @@ MERGE_DISTANCE = 1e-4
 
 
 class BwmSaver:
-    def __init__(self, path, walkmesh):
+    def __init__(self, path, walkmesh, aabb_split=AabbSplit.CENTROID, aabb_trees=None):
         self.path = path
         self.bwm = BinaryWriter(path, 'little')
         self.walkmesh = walkmesh
+        self.aabb_split = aabb_split
+        self.aabb_trees = aabb_trees if aabb_trees else aabb.AabbTreeCache()
 
         self.bwm_pos = 0
         self.bwm_size = 0
@@ -59,8 +63,9 @@ class BwmSaver:
         self.use_node1 = None
         self.use_node2 = None
 
-        self.verts = []
+        self.verts = np.zeros((0, 3))
         self.new_vert_by_old_vert = dict()
+        self.new_face_by_old_face = dict()
         self.facelist = FaceList()
         self.aabbs = []
         self.adjacent_edges = []
@@ -78,6 +83,8 @@ class BwmSaver:
         self.save_outer_edges()
         self.save_perimeters()
 
+        self.bwm.save()
+
     def peek_walkmesh(self):
         self.bwm_type = BWM_TYPE_WOK if self.walkmesh.walkmesh_type == WalkmeshType.WOK else BWM_TYPE_PWK_DWK
         self.geom_node = self.walkmesh.root_node.find_node(lambda node: isinstance(node, AabbNode))
@@ -135,58 +142,47 @@ class BwmSaver:
 
     def peek_vertices(self):
         # Merge duplicates (fixes collision detection)
-        num_verts = len(self.geom_node.verts)
-        num_unique = 0
-        for vert_idx, vert in enumerate(self.geom_node.verts):
+        verts = self.geom_node.verts.tolist()
+        grid = utils.build_close_grid(verts, MERGE_DISTANCE)
+        unique_indices = []
+        for vert_idx, vert in enumerate(verts):
             if vert_idx in self.new_vert_by_old_vert:
                 continue
-            for other_vert_idx in range(vert_idx+1, num_verts):
-                if other_vert_idx in self.new_vert_by_old_vert:
+            num_unique = len(unique_indices)
+            for other_vert_idx in utils.find_close_candidates(grid, vert, MERGE_DISTANCE):
+                if other_vert_idx <= vert_idx or other_vert_idx in self.new_vert_by_old_vert:
                     continue
-                other_vert = self.geom_node.verts[other_vert_idx]
+                other_vert = verts[other_vert_idx]
                 if utils.is_close_3(vert, other_vert, MERGE_DISTANCE):
                     self.new_vert_by_old_vert[other_vert_idx] = num_unique
-            self.verts.append(vert)
+            unique_indices.append(vert_idx)
             self.new_vert_by_old_vert[vert_idx] = num_unique
-            num_unique += 1
 
         # Offset by node and LYT position
-        for vert_idx, vert in enumerate(self.verts):
-            self.verts[vert_idx] = [vert[i] + self.geom_node.position[i] + self.geom_node.lytposition[i] for i in range(3)]
+        self.verts = self.geom_node.verts[unique_indices].astype(np.float64).reshape((-1, 3))
+        self.verts = self.verts + np.asarray(self.geom_node.position) + np.asarray(self.geom_node.lytposition)
 
     def peek_faces(self):
-        walkable_face_indices = []
-        non_walkable_face_indices = []
-        for face_idx, _ in enumerate(self.geom_node.facelist.vertices):
-            mat_id = self.geom_node.facelist.materials[face_idx]
-            if mat_id in WalkmeshMaterial.NONWALKABLE:
-                non_walkable_face_indices.append(face_idx)
-            else:
-                walkable_face_indices.append(face_idx)
-                self.num_walkable_faces += 1
-        face_indices = walkable_face_indices + non_walkable_face_indices
-        for face_idx in face_indices:
-            self.facelist.vertices.append([self.new_vert_by_old_vert[vert_idx] for vert_idx in self.geom_node.facelist.vertices[face_idx]])
-            self.facelist.materials.append(self.geom_node.facelist.materials[face_idx])
-            self.facelist.normals.append(self.geom_node.facelist.normals[face_idx])
+        # Walkable faces come first, in their original order
+        facelist = self.geom_node.facelist
+        walkable = np.isin(facelist.materials, WalkmeshMaterial.NONWALKABLE, invert=True)
+        face_indices = np.concatenate((np.flatnonzero(walkable), np.flatnonzero(~walkable)))
+        self.num_walkable_faces = int(np.count_nonzero(walkable))
+        self.new_face_by_old_face = {face_idx: new_idx for new_idx, face_idx in enumerate(face_indices.tolist())}
+
+        new_vert_by_old_vert = np.array([self.new_vert_by_old_vert[vert_idx] for vert_idx in range(len(self.geom_node.verts))], dtype=np.uint32)
+        self.facelist.vertices = new_vert_by_old_vert[facelist.vertices[face_indices]]
+        self.facelist.materials = facelist.materials[face_indices]
+        self.facelist.normals = facelist.normals[face_indices]
 
     def peek_aabbs(self):
         if self.bwm_type == BWM_TYPE_PWK_DWK:
             return
 
-        face_list = []
-        face_idx = 0
-
-        for face in self.facelist.vertices:
-            v0 = Vector(self.verts[face[0]])
-            v1 = Vector(self.verts[face[1]])
-            v2 = Vector(self.verts[face[2]])
-            centroid = (v0 + v1 + v2) / 3
-            face_list.append((face_idx, [v0, v1, v2], centroid))
-            face_idx += 1
-
-        aabbs = []
-        aabb.generate_tree(aabbs, face_list)
+        # Tree is shared with the MDL AABB node, so build it from the original
+        # faces and refit it to merged vertices and reordered faces
+        aabbs = self.aabb_trees.get_tree(self.geom_node.verts, self.geom_node.facelist.vertices, self.aabb_split)
+        aabbs = aabb.refit_tree(aabbs, self.verts, self.facelist.vertices, self.new_face_by_old_face)
 
         for aabb_node in aabbs:
             child_idx1 = aabb_node[6]
@@ -209,27 +205,7 @@ class BwmSaver:
 
     def peek_edges(self):
         # Adjacent Edges
-        for _ in range(self.num_walkable_faces):
-            self.adjacent_edges.append([-1, -1, -1])
-        for face_idx in range(self.num_walkable_faces):
-            face = self.facelist.vertices[face_idx]
-            edges = [tuple(sorted(edge)) for edge in [(face[0], face[1]), (face[1], face[2]), (face[2], face[0])]]
-            for other_face_idx in range(face_idx + 1, self.num_walkable_faces):
-                other_face = self.facelist.vertices[other_face_idx]
-                other_edges = [tuple(sorted(edge)) for edge in [(other_face[0], other_face[1]), (other_face[1], other_face[2]), (other_face[2], other_face[0])]]
-                num_adj_edges = 0
-                for i in range(3):
-                    if self.adjacent_edges[face_idx][i] != -1:
-                        num_adj_edges += 1
-                        continue
-                    for j in range(3):
-                        if edges[i] == other_edges[j]:
-                            self.adjacent_edges[face_idx][i] = 3 * other_face_idx + j
-                            self.adjacent_edges[other_face_idx][j] = 3 * face_idx + i
-                            num_adj_edges += 1
-                            break
-                if num_adj_edges == 3:
-                    break
+        self.adjacent_edges = adjacency.find_adjacent_edges(self.facelist.vertices[:self.num_walkable_faces].tolist())
 
         # Outer Edges, Perimeters
         visited_edges = set()
@@ -296,16 +272,11 @@ class BwmSaver:
 
         self.bwm.put_string("BWM V1.0")
         self.bwm.put_uint32(self.bwm_type)
-        for val in rel_use_vec1:
-            self.bwm.put_float(val)
-        for val in rel_use_vec2:
-            self.bwm.put_float(val)
-        for val in abs_use_vec1:
-            self.bwm.put_float(val)
-        for val in abs_use_vec2:
-            self.bwm.put_float(val)
-        for val in position:
-            self.bwm.put_float(val)
+        self.bwm.put_floats(rel_use_vec1)
+        self.bwm.put_floats(rel_use_vec2)
+        self.bwm.put_floats(abs_use_vec1)
+        self.bwm.put_floats(abs_use_vec2)
+        self.bwm.put_floats(position)
         self.bwm.put_uint32(num_verts)
         self.bwm.put_uint32(self.off_verts)
         self.bwm.put_uint32(num_faces)
@@ -324,24 +295,17 @@ class BwmSaver:
         self.bwm.put_uint32(off_perimeters)
 
     def save_vertices(self):
-        for vert in self.verts:
-            for val in vert:
-                self.bwm.put_float(val)
+        self.bwm.put_floats(self.verts)
 
     def save_faces(self):
         # Vertex Indices
-        for face in self.facelist.vertices:
-            for val in face:
-                self.bwm.put_uint32(val)
+        self.bwm.put_uint32s(self.facelist.vertices)
 
         # Material Ids
-        for mat_id in self.facelist.materials:
-            self.bwm.put_uint32(mat_id)
+        self.bwm.put_uint32s(self.facelist.materials)
 
         # Normals
-        for normal in self.facelist.normals:
-            for val in normal:
-                self.bwm.put_float(val)
+        self.bwm.put_floats(self.facelist.normals)
 
         # Distances
         for face_idx, face in enumerate(self.facelist.vertices):
@@ -351,25 +315,22 @@ class BwmSaver:
             self.bwm.put_float(distance)
 
     def save_aabbs(self):
+        record = self.bwm.new_record("6fiIIii")
         for aabb in self.aabbs:
-            for val in aabb.bounding_box:
-                self.bwm.put_float(val)
-            self.bwm.put_int32(aabb.face_idx)
-            self.bwm.put_uint32(4)  # unknown
-            self.bwm.put_uint32(aabb.most_significant_plane)
-            self.bwm.put_int32(aabb.child_idx1)
-            self.bwm.put_int32(aabb.child_idx2)
+            self.bwm.put_record(record,
+                                *aabb.bounding_box,
+                                aabb.face_idx,
+                                4,  # unknown
+                                aabb.most_significant_plane,
+                                aabb.child_idx1,
+                                aabb.child_idx2)
 
     def save_adjacent_edges(self):
         for edges in self.adjacent_edges:
-            for val in edges:
-                self.bwm.put_int32(val)
+            self.bwm.put_int32s(edges)
 
     def save_outer_edges(self):
-        for edge_idx, transition in self.outer_edges:
-            self.bwm.put_uint32(edge_idx)
-            self.bwm.put_int32(transition)
+        self.bwm.put_records(self.bwm.new_record("Ii"), self.outer_edges)
 
     def save_perimeters(self):
-        for perimeter in self.perimeters:
-            self.bwm.put_uint32(perimeter)
+        self.bwm.put_uint32s(self.perimeters)
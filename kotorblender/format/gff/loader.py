@@ -61,23 +61,17 @@ class GffLoader:
     def load_structs(self):
         self.structs = []
         self.reader.seek(self.off_structs)
-        for _ in range(self.num_structs):
-            struct = GffStruct(
-                self.reader.get_uint32(),
-                self.reader.get_uint32(),
-                self.reader.get_uint32()
-            )
+        record = self.reader.new_record("3I")
+        for values in self.reader.get_records(record, self.num_structs):
+            struct = GffStruct(*values)
             self.structs.append(struct)
 
     def load_fields(self):
         self.fields = []
         self.reader.seek(self.off_fields)
-        for _ in range(self.num_fields):
-            field = GffField(
-                self.reader.get_uint32(),
-                self.reader.get_uint32(),
-                self.reader.get_uint32()
-            )
+        record = self.reader.new_record("3I")
+        for values in self.reader.get_records(record, self.num_fields):
+            field = GffField(*values)
             self.fields.append(field)
 
     def load_labels(self):
@@ -90,11 +84,11 @@ class GffLoader:
 
     def load_field_indices(self):
         self.reader.seek(self.off_field_indices)
-        self.field_indices = [self.reader.get_uint32() for _ in range(self.num_field_indices // 4)]
+        self.field_indices = self.reader.get_uint32s(self.num_field_indices // 4)
 
     def load_list_indices(self):
         self.reader.seek(self.off_list_indices)
-        self.list_indices = [self.reader.get_uint32() for _ in range(self.num_list_indices // 4)]
+        self.list_indices = self.reader.get_uint32s(self.num_list_indices // 4)
 
     def new_tree_struct(self, structIdx):
         tree = dict()
@@ -53,35 +53,26 @@ class GffSaver:
 
         self.writer.put_string(self.file_type)
         self.writer.put_string(FILE_VERSION)
-        self.writer.put_uint32(off_structs)
-        self.writer.put_uint32(num_structs)
-        self.writer.put_uint32(off_fields)
-        self.writer.put_uint32(num_fields)
-        self.writer.put_uint32(off_labels)
-        self.writer.put_uint32(num_labels)
-        self.writer.put_uint32(off_field_data)
-        self.writer.put_uint32(num_field_data)
-        self.writer.put_uint32(off_field_indices)
-        self.writer.put_uint32(num_field_indices)
-        self.writer.put_uint32(off_list_indices)
-        self.writer.put_uint32(num_list_indices)
-
+        self.writer.put_uint32s([off_structs, num_structs,
+                                 off_fields, num_fields,
+                                 off_labels, num_labels,
+                                 off_field_data, num_field_data,
+                                 off_field_indices, num_field_indices,
+                                 off_list_indices, num_list_indices])
+
+        record = self.writer.new_record("3I")
         for struct in self.structs:
-            self.writer.put_uint32(struct.type)
-            self.writer.put_uint32(struct.data_or_data_offset)
-            self.writer.put_uint32(struct.num_fields)
+            self.writer.put_record(record, struct.type, struct.data_or_data_offset, struct.num_fields)
         for field in self.fields:
-            self.writer.put_uint32(field.type)
-            self.writer.put_uint32(field.label_idx)
-            self.writer.put_uint32(field.data_or_data_offset)
+            self.writer.put_record(record, field.type, field.label_idx, field.data_or_data_offset)
         for label in self.labels:
             self.writer.put_string(label.ljust(16, '\0'))
         if len(self.field_data) > 0:
             self.writer.put_bytes(bytearray(self.field_data))
-        for idx in self.field_indices:
-            self.writer.put_uint32(idx)
-        for idx in self.list_indices:
-            self.writer.put_uint32(idx)
+        self.writer.put_uint32s(self.field_indices)
+        self.writer.put_uint32s(self.list_indices)
+
+        self.writer.save()
 
     def decompose_tree(self):
         num_structs = 0
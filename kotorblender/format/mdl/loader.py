@@ -18,13 +18,15 @@
 
 import os
 
-from math import sqrt
+from fnmatch import fnmatchcase
+
+import numpy as np
 
 from mathutils import Matrix, Quaternion, Vector
 
 from ...defines import NodeType
 from ...scene.animation import Animation
-from ...scene.animnode import AnimationNode
+from ...scene.animnode import AnimationNode, KeyframeList
 from ...scene.model import Model
 from ...scene.modelnode.aabb import AabbNode
 from ...scene.modelnode.danglymesh import DanglymeshNode
@@ -59,6 +61,16 @@ SABER_FACES = [
     [10, 14, 11]
 ]
 
+SPLIT_AXIS_BY_PLANE = {
+    AABB_NEGATIVE_Z: -3,
+    AABB_NEGATIVE_Y: -2,
+    AABB_NEGATIVE_X: -1,
+    AABB_NO_CHILDREN: 0,
+    AABB_POSITIVE_X: 1,
+    AABB_POSITIVE_Y: 2,
+    AABB_POSITIVE_Z: 3
+}
+
 
 class ArrayDefinition:
     def __init__(self, offset, count):
@@ -66,9 +78,22 @@ class ArrayDefinition:
         self.count = count
 
 
+class AnimationHeader:
+    def __init__(self, offset, name, length, transtime, animroot, event_arr, off_root_node):
+        self.offset = offset
+        self.name = name
+        self.length = length
+        self.transtime = transtime
+        self.animroot = animroot
+        self.num_events = event_arr.count
+        self.event_arr = event_arr
+        self.off_root_node = off_root_node
+
+
 class MdlLoader:
-    def __init__(self, path):
+    def __init__(self, path, load_aabb_trees=True):
         self.path = path
+        self.load_aabb_trees = load_aabb_trees
         self.mdl = BinaryReader(path, 'little')
 
         base, _ = os.path.splitext(path)
@@ -78,12 +103,22 @@ class MdlLoader:
 
         self.mdx = BinaryReader(mdx_path, 'little')
 
+        self.array_def_record = self.mdl.new_record("3I")
+        self.face_dtype = np.dtype([("normal", "<f4", (3,)),
+                                    ("plane_distance", "<f4"),
+                                    ("material_id", "<u4"),
+                                    ("adjacent_faces", "<u2", (3,)),
+                                    ("vert_indices", "<u2", (3,))])
+        self.controller_key_record = self.mdl.new_record("I2xHHHB3x")
+        self.aabb_record = self.mdl.new_record("6fIIiI")
+
         self.tsl = False
         self.xbox = False
         self.node_names = []
         self.node_by_number = dict()
+        self.animation_headers = []
 
-    def load(self):
+    def load(self, animation_filter=None):
         self.model = Model()
 
         self.load_file_header()
@@ -91,10 +126,11 @@ class MdlLoader:
         self.load_model_header()
         self.load_names()
         self.peek_nodes(self.off_root_node)
+        self.peek_animations()
 
         self.model.root_node = self.load_nodes(self.off_root_node, 0)
 
-        self.load_animations()
+        self.load_animations(animation_filter)
 
         return self.model
 
@@ -135,7 +171,7 @@ class MdlLoader:
         num_child_models = self.mdl.get_uint32()
         self.animation_arr = self.get_array_def()
         supermodel_ref = self.mdl.get_uint32()
-        bounding_box = [self.mdl.get_float() for _ in range(6)]
+        bounding_box = self.mdl.get_floats(6)
         radius = self.mdl.get_float()
         scale = self.mdl.get_float()
         supermodel_name = self.mdl.get_c_string_up_to(32)
@@ -161,7 +197,7 @@ class MdlLoader:
     def load_names(self):
         self.names = []
         self.mdl.seek(MDL_OFFSET + self.name_arr.offset)
-        offsets = [self.mdl.get_uint32() for _ in range(self.name_arr.count)]
+        offsets = self.mdl.get_uint32s(self.name_arr.count)
         for off in offsets:
             self.mdl.seek(MDL_OFFSET + off)
             self.names.append(self.mdl.get_c_string())
@@ -177,7 +213,7 @@ class MdlLoader:
         self.node_names.append(name)
 
         self.mdl.seek(MDL_OFFSET + children_arr.offset)
-        child_offsets = [self.mdl.get_uint32() for _ in range(children_arr.count)]
+        child_offsets = self.mdl.get_uint32s(children_arr.count)
         for off_child in child_offsets:
             self.peek_nodes(off_child)
 
@@ -190,8 +226,8 @@ class MdlLoader:
         self.mdl.skip(2)  # padding
         off_root = self.mdl.get_uint32()
         off_parent = self.mdl.get_uint32()
-        position = [self.mdl.get_float() for _ in range(3)]
-        orientation = [self.mdl.get_float() for _ in range(4)]
+        position = self.mdl.get_floats(3)
+        orientation = self.mdl.get_floats(4)
         children_arr = self.get_array_def()
         controller_arr = self.get_array_def()
         controller_data_arr = self.get_array_def()
@@ -236,7 +272,7 @@ class MdlLoader:
             node.dynamictype = dynamic_type
             node.affectdynamic = affect_dynamic
             node.fadinglight = fading_light
-            node.lensflares = flare
+            node.lensflares = 1 if flare_radius > 0 or flare >= 1 else 0
             node.flareradius = flare_radius
             node.flare_list = FlareList()
 
@@ -306,11 +342,11 @@ class MdlLoader:
             fn_ptr1 = self.mdl.get_uint32()
             fn_ptr2 = self.mdl.get_uint32()
             face_arr = self.get_array_def()
-            bouding_box = [self.mdl.get_float() for _ in range(6)]
+            bouding_box = self.mdl.get_floats(6)
             radius = self.mdl.get_float()
-            average = [self.mdl.get_float() for _ in range(3)]
-            diffuse = [self.mdl.get_float() for _ in range(3)]
-            ambient = [self.mdl.get_float() for _ in range(3)]
+            average = self.mdl.get_floats(3)
+            diffuse = self.mdl.get_floats(3)
+            ambient = self.mdl.get_floats(3)
             transparency_hint = self.mdl.get_uint32()
             bitmap = self.mdl.get_c_string_up_to(32)
             bitmap2 = self.mdl.get_c_string_up_to(32)
@@ -400,7 +436,7 @@ class MdlLoader:
             qbone_arr = self.get_array_def()
             tbone_arr = self.get_array_def()
             garbage_arr = self.get_array_def()
-            bone_indices = [self.mdl.get_uint16() for _ in range(16)]
+            bone_indices = self.mdl.get_uint16s(16)
             self.mdl.skip(4)  # padding
 
         if type_flags & NODE_DANGLY:
@@ -416,7 +452,8 @@ class MdlLoader:
 
         if type_flags & NODE_AABB:
             off_root_aabb = self.mdl.get_uint32()
-            self.load_aabb(off_root_aabb)
+            if self.load_aabb_trees:
+                node.aabb_tree = self.load_aabb(off_root_aabb)
 
         if type_flags & NODE_SABER:
             off_saber_verts = self.mdl.get_uint32()
@@ -427,37 +464,39 @@ class MdlLoader:
 
         if controller_arr.count > 0:
             controllers = self.load_controllers(controller_arr, controller_data_arr)
+            # Geometry nodes only use the first row of each controller, controllers without rows are ignored
+            controllers = {ctrl_type: rows[0].tolist() for ctrl_type, rows in controllers.items() if len(rows) > 0}
             if type_flags & NODE_MESH:
-                node.alpha = controllers[CTRL_MESH_ALPHA][0][1] if CTRL_MESH_ALPHA in controllers else 1.0
-                node.scale = controllers[CTRL_MESH_SCALE][0][1] if CTRL_MESH_SCALE in controllers else 1.0
-                node.selfillumcolor = controllers[CTRL_MESH_SELFILLUMCOLOR][0][1:] if CTRL_MESH_SELFILLUMCOLOR in controllers else [0.0] * 3
+                node.alpha = controllers[CTRL_MESH_ALPHA][1] if CTRL_MESH_ALPHA in controllers else 1.0
+                node.scale = controllers[CTRL_MESH_SCALE][1] if CTRL_MESH_SCALE in controllers else 1.0
+                node.selfillumcolor = controllers[CTRL_MESH_SELFILLUMCOLOR][1:] if CTRL_MESH_SELFILLUMCOLOR in controllers else [0.0] * 3
             elif type_flags & NODE_LIGHT:
-                node.radius = controllers[CTRL_LIGHT_RADIUS][0][1] if CTRL_LIGHT_RADIUS in controllers else 1.0
-                node.multiplier = controllers[CTRL_LIGHT_MULTIPLIER][0][1] if CTRL_LIGHT_MULTIPLIER in controllers else 1.0
-                node.color = controllers[CTRL_LIGHT_COLOR][0][1:] if CTRL_LIGHT_COLOR in controllers else [1.0] * 3
+                node.radius = controllers[CTRL_LIGHT_RADIUS][1] if CTRL_LIGHT_RADIUS in controllers else 1.0
+                node.multiplier = controllers[CTRL_LIGHT_MULTIPLIER][1] if CTRL_LIGHT_MULTIPLIER in controllers else 1.0
+                node.color = controllers[CTRL_LIGHT_COLOR][1:] if CTRL_LIGHT_COLOR in controllers else [1.0] * 3
             elif type_flags & NODE_EMITTER:
                 for val, key, dim in EMITTER_CONTROLLER_KEYS:
                     if val not in controllers:
                         continue
                     if dim == 1:
-                        setattr(node, key, controllers[val][0][1])
+                        setattr(node, key, controllers[val][1])
                     else:
-                        setattr(node, key, controllers[val][0][1:dim+1])
+                        setattr(node, key, controllers[val][1:dim+1])
 
         if type_flags & NODE_LIGHT:
             self.mdl.seek(MDL_OFFSET + flare_size_arr.offset)
-            node.flare_list.sizes = [self.mdl.get_float() for _ in range(flare_size_arr.count)]
+            node.flare_list.sizes = self.mdl.get_floats(flare_size_arr.count)
 
             self.mdl.seek(MDL_OFFSET + flare_position_arr.offset)
-            node.flare_list.positions = [self.mdl.get_float() for _ in range(flare_position_arr.count)]
+            node.flare_list.positions = self.mdl.get_floats(flare_position_arr.count)
 
             self.mdl.seek(MDL_OFFSET + flare_color_shift_arr.offset)
-            for _ in range(flare_color_shift_arr.count):
-                color_shift = [self.mdl.get_float() for _ in range(3)]
-                node.flare_list.colorshifts.append(color_shift)
+            values = self.mdl.get_floats(3 * flare_color_shift_arr.count)
+            for i in range(flare_color_shift_arr.count):
+                node.flare_list.colorshifts.append(values[3*i:3*i+3])
 
             self.mdl.seek(MDL_OFFSET + flare_tex_name_arr.offset)
-            tex_name_offsets = [self.mdl.get_uint32() for _ in range(flare_tex_name_arr.count)]
+            tex_name_offsets = self.mdl.get_uint32s(flare_tex_name_arr.count)
             for tex_name_offset in tex_name_offsets:
                 self.mdl.seek(MDL_OFFSET + tex_name_offset)
                 node.flare_list.textures.append(self.mdl.get_c_string())
@@ -466,35 +505,30 @@ class MdlLoader:
             if num_bonemap > 0:
                 self.mdl.seek(MDL_OFFSET + off_bonemap)
                 if self.xbox:
-                    bonemap = [self.mdl.get_uint16() for _ in range(num_bonemap)]
+                    bonemap = self.mdl.get_uint16s(num_bonemap)
                 else:
-                    bonemap = [int(self.mdl.get_float()) for _ in range(num_bonemap)]
+                    bonemap = [int(val) for val in self.mdl.get_floats(num_bonemap)]
             else:
                 bonemap = []
+            # Unused bonemap entries and bone slots are 0xffff on Xbox and -1 on PC
+            no_bone = 0xffff if self.xbox else -1
             node_by_bone = dict()
             for node_idx, bone_idx in enumerate(bonemap):
-                if bone_idx == -1:
+                if bone_idx == no_bone:
                     continue
                 node_by_bone[bone_idx] = node_idx
 
         if type_flags & NODE_MESH:
             node.facelist = FaceList()
             if type_flags & NODE_SABER:
-                for face in SABER_FACES:
-                    node.facelist.vertices.append(face)
-                    node.facelist.uv.append(face)
-                    node.facelist.materials.append(0)
+                node.facelist.vertices = SABER_FACES
+                node.facelist.materials = [0] * len(SABER_FACES)
             elif face_arr.count > 0:
                 self.mdl.seek(MDL_OFFSET + face_arr.offset)
-                for _ in range(face_arr.count):
-                    normal = [self.mdl.get_float() for _ in range(3)]
-                    plane_distance = self.mdl.get_float()
-                    material_id = self.mdl.get_uint32()
-                    adjacent_faces = [self.mdl.get_uint16() for _ in range(3)]
-                    vert_indices = [self.mdl.get_uint16() for _ in range(3)]
-                    node.facelist.vertices.append(tuple(vert_indices))
-                    node.facelist.uv.append(tuple(vert_indices))
-                    node.facelist.materials.append(material_id)
+                faces = np.frombuffer(self.mdl.get_bytes(face_arr.count * self.face_dtype.itemsize), dtype=self.face_dtype)
+                node.facelist.vertices = faces["vert_indices"]
+                node.facelist.materials = faces["material_id"]
+                node.facelist.normals = faces["normal"]
                 if index_count_arr.count > 0:
                     self.mdl.seek(MDL_OFFSET + index_count_arr.offset)
                     num_indices = self.mdl.get_uint32()
@@ -505,60 +539,67 @@ class MdlLoader:
             node.verts = []
             node.uv1 = []
             node.uv2 = []
-            node.weights = []
 
             if type_flags & NODE_SABER:
-                saber_verts = []
                 self.mdl.seek(MDL_OFFSET + off_saber_verts)
-                for i in range(NUM_SABER_VERTS):
-                    saber_verts.append([self.mdl.get_float() for _ in range(3)])
-                saber_tverts = []
+                values = self.mdl.get_floats(3 * NUM_SABER_VERTS)
+                saber_verts = [values[3*i:3*i+3] for i in range(NUM_SABER_VERTS)]
                 self.mdl.seek(MDL_OFFSET + off_saber_uv)
-                for i in range(NUM_SABER_VERTS):
-                    saber_tverts.append([self.mdl.get_float() for _ in range(2)])
-                saber_normals = []
+                values = self.mdl.get_floats(2 * NUM_SABER_VERTS)
+                saber_tverts = [values[2*i:2*i+2] for i in range(NUM_SABER_VERTS)]
                 self.mdl.seek(MDL_OFFSET + off_saber_normals)
-                for i in range(NUM_SABER_VERTS):
-                    saber_normals.append([self.mdl.get_float() for _ in range(3)])
-
-                for i in range(8):
-                    node.verts.append(saber_verts[i])
-                    node.normals.append(saber_normals[i])
-                    node.uv1.append(saber_tverts[i])
-                for i in range(88, 96):
-                    node.verts.append(saber_verts[i])
-                    node.normals.append(saber_normals[i])
-                    node.uv1.append(saber_tverts[i])
-
-            elif mdx_data_size > 0:
-                for i in range(num_verts):
-                    self.mdx.seek(mdx_offset + i * mdx_data_size + off_mdx_verts)
-                    node.verts.append(tuple([self.mdx.get_float() for _ in range(3)]))
-                    if mdx_data_bitmap & MDX_FLAG_NORMAL:
-                        self.mdx.seek(mdx_offset + i * mdx_data_size + off_mdx_normals)
-                        if self.xbox:
-                            comp = self.mdx.get_uint32()
-                            node.normals.append(self.decompress_vector_xbox(comp))
-                        else:
-                            node.normals.append(tuple([self.mdx.get_float() for _ in range(3)]))
-                    if mdx_data_bitmap & MDX_FLAG_UV1:
-                        self.mdx.seek(mdx_offset + i * mdx_data_size + off_mdx_uv1)
-                        node.uv1.append(tuple([self.mdx.get_float() for _ in range(2)]))
-                    if mdx_data_bitmap & MDX_FLAG_UV2:
-                        self.mdx.seek(mdx_offset + i * mdx_data_size + off_mdx_uv2)
-                        node.uv2.append(tuple([self.mdx.get_float() for _ in range(2)]))
-                    if type_flags & NODE_SKIN:
-                        self.mdx.seek(mdx_offset + i * mdx_data_size + off_mdx_bone_weights)
-                        bone_weights = [self.mdx.get_float() for _ in range(4)]
-                        self.mdx.seek(mdx_offset + i * mdx_data_size + off_mdx_bone_indices)
-                        if self.xbox:
-                            bone_indices = [self.mdx.get_uint16() for _ in range(4)]
-                        else:
-                            bone_indices = [int(self.mdx.get_float()) for _ in range(4)]
+                values = self.mdl.get_floats(3 * NUM_SABER_VERTS)
+                saber_normals = [values[3*i:3*i+3] for i in range(NUM_SABER_VERTS)]
+
+                saber_indices = list(range(8)) + list(range(88, 96))
+                node.verts = [saber_verts[i] for i in saber_indices]
+                node.normals = [saber_normals[i] for i in saber_indices]
+                node.uv1 = [saber_tverts[i] for i in saber_indices]
+
+                face_verts = node.verts.astype(np.float64)[node.facelist.vertices]
+                face_normals = np.cross(face_verts[:, 1] - face_verts[:, 0], face_verts[:, 2] - face_verts[:, 0])
+                lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
+                face_normals = np.divide(face_normals, lengths, out=np.zeros_like(face_normals), where=lengths > 0.0)
+                node.facelist.normals = face_normals
+
+            elif mdx_data_size > 0 and num_verts > 0:
+                self.mdx.seek(mdx_offset)
+                mdx_data = self.mdx.get_bytes(num_verts * mdx_data_size)
+
+                def get_attribute(offset, dtype, dim):
+                    return self.get_mdx_attribute(mdx_data, num_verts, mdx_data_size, offset, dtype, dim)
+
+                node.verts = get_attribute(off_mdx_verts, "<f4", 3)
+                if mdx_data_bitmap & MDX_FLAG_NORMAL:
+                    if self.xbox:
+                        normals = self.decompress_vectors_xbox(get_attribute(off_mdx_normals, "<u4", 1)[:, 0])
+                    else:
+                        normals = get_attribute(off_mdx_normals, "<f4", 3)
+                    node.normals = normals
+                if mdx_data_bitmap & MDX_FLAG_UV1:
+                    node.uv1 = get_attribute(off_mdx_uv1, "<f4", 2)
+                if mdx_data_bitmap & MDX_FLAG_UV2:
+                    node.uv2 = get_attribute(off_mdx_uv2, "<f4", 2)
+                if mdx_data_bitmap & MDX_FLAG_TANGENT1:
+                    if self.xbox:
+                        tangent_space = self.decompress_vectors_xbox(get_attribute(off_mdx_tan_space1, "<u4", 3).reshape(-1))
+                    else:
+                        tangent_space = get_attribute(off_mdx_tan_space1, "<f4", 9)
+                    tangent_space = tangent_space.reshape(num_verts, 3, 3)
+                    node.bitangents = tangent_space[:, 0]
+                    node.tangents = tangent_space[:, 1]
+                    node.tangentspacenormals = tangent_space[:, 2]
+                if type_flags & NODE_SKIN:
+                    all_bone_weights = get_attribute(off_mdx_bone_weights, "<f4", 4).tolist()
+                    if self.xbox:
+                        all_bone_indices = get_attribute(off_mdx_bone_indices, "<u2", 4).tolist()
+                    else:
+                        all_bone_indices = get_attribute(off_mdx_bone_indices, "<f4", 4).astype(np.int32).tolist()
+                    for bone_weights, bone_indices in zip(all_bone_weights, all_bone_indices):
                         vert_weights = []
                         for i in range(4):
                             bone_idx = bone_indices[i]
-                            if bone_idx == -1:
+                            if bone_idx == no_bone:
                                 continue
                             node_idx = node_by_bone[bone_idx]
                             node_name = self.node_names[node_idx]
@@ -567,10 +608,10 @@ class MdlLoader:
 
         if type_flags & NODE_DANGLY:
             self.mdl.seek(MDL_OFFSET + constraint_arr.offset)
-            node.constraints = [self.mdl.get_float() for _ in range(constraint_arr.count)]
+            node.constraints = self.mdl.get_floats(constraint_arr.count)
 
         self.mdl.seek(MDL_OFFSET + children_arr.offset)
-        child_offsets = [self.mdl.get_uint32() for _ in range(children_arr.count)]
+        child_offsets = self.mdl.get_uint32s(children_arr.count)
         for child_idx, off_child in enumerate(child_offsets):
             child = self.load_nodes(off_child, child_idx, node)
             node.children.append(child)
@@ -578,27 +619,39 @@ class MdlLoader:
         return node
 
     def load_aabb(self, offset):
-        self.mdl.seek(MDL_OFFSET + offset)
-        bounding_box = [self.mdl.get_float() for _ in range(6)]
-        off_child1 = self.mdl.get_uint32()
-        off_child2 = self.mdl.get_uint32()
-        face_idx = self.mdl.get_int32()
-        most_significant_plane = self.mdl.get_uint32()
-
-        if off_child1 > 0:
-            self.load_aabb(off_child1)
-        if off_child2 > 0:
-            self.load_aabb(off_child2)
-
-    def load_animations(self):
+        # Nodes are read depth-first, left subtree before right subtree, into
+        # the same flat layout that aabb.generate_tree produces
+        aabb_tree = []
+        stack = [(offset, None, 0)]
+        while stack:
+            offset, parent, child_slot = stack.pop()
+            if parent is not None:
+                parent[child_slot] = len(aabb_tree)
+
+            self.mdl.seek(MDL_OFFSET + offset)
+            values = self.mdl.get_record(self.aabb_record)
+            bounding_box = list(values[:6])
+            off_child1, off_child2, face_idx, most_significant_plane = values[6:]
+
+            aabb = [*bounding_box, -1, -1, face_idx, SPLIT_AXIS_BY_PLANE.get(most_significant_plane, 0)]
+            aabb_tree.append(aabb)
+            if off_child2 > 0:
+                stack.append((off_child2, aabb, 7))
+            if off_child1 > 0:
+                stack.append((off_child1, aabb, 6))
+
+        return aabb_tree
+
+    def peek_animations(self):
+        self.animation_headers = []
         if self.animation_arr.count == 0:
             return
         self.mdl.seek(MDL_OFFSET + self.animation_arr.offset)
-        offsets = [self.mdl.get_uint32() for _ in range(self.animation_arr.count)]
+        offsets = self.mdl.get_uint32s(self.animation_arr.count)
         for offset in offsets:
-            self.load_animation(offset)
+            self.animation_headers.append(self.peek_animation(offset))
 
-    def load_animation(self, offset):
+    def peek_animation(self, offset):
         self.mdl.seek(MDL_OFFSET + offset)
 
         fn_ptr1 = self.mdl.get_uint32()
@@ -617,20 +670,38 @@ class MdlLoader:
         event_arr = self.get_array_def()
         self.mdl.skip(4)  # padding
 
-        anim = Animation(name)
-        anim.length = length
-        anim.transtime = transition
-        anim.animroot = anim_root
+        return AnimationHeader(offset, name, length, transition, anim_root, event_arr, off_root_node)
+
+    def load_animations(self, animation_filter=None):
+        for header in self.animation_headers:
+            if animation_filter is None or self.matches_animation_filter(header.name, animation_filter):
+                self.model.animations.append(self.load_animation(header))
 
-        if event_arr.count > 0:
-            self.mdl.seek(MDL_OFFSET + event_arr.offset)
-            for _ in range(event_arr.count):
+    def load_animation_by_name(self, name):
+        header = next(iter(header for header in self.animation_headers if header.name.lower() == name.lower()), None)
+        if not header:
+            raise RuntimeError("Animation not found: " + name)
+        return self.load_animation(header)
+
+    def load_animation(self, header):
+        anim = Animation(header.name)
+        anim.length = header.length
+        anim.transtime = header.transtime
+        anim.animroot = header.animroot
+
+        if header.event_arr.count > 0:
+            self.mdl.seek(MDL_OFFSET + header.event_arr.offset)
+            for _ in range(header.event_arr.count):
                 time = self.mdl.get_float()
                 event_name = self.mdl.get_c_string_up_to(32)
                 anim.events.append((time, event_name))
 
-        anim.root_node = self.load_anim_nodes(off_root_node, anim)
-        self.model.animations.append(anim)
+        anim.root_node = self.load_anim_nodes(header.off_root_node, anim)
+
+        return anim
+
+    def matches_animation_filter(self, name, animation_filter):
+        return any(fnmatchcase(name.lower(), pattern.lower()) for pattern in animation_filter)
 
     def load_anim_nodes(self, offset, anim, parent=None):
         self.mdl.seek(MDL_OFFSET + offset)
@@ -641,8 +712,8 @@ class MdlLoader:
         self.mdl.skip(2)  # padding
         off_root = self.mdl.get_uint32()
         off_parent = self.mdl.get_uint32()
-        position = [self.mdl.get_float() for _ in range(3)]
-        orientation = [self.mdl.get_float() for _ in range(4)]
+        position = self.mdl.get_floats(3)
+        orientation = self.mdl.get_floats(4)
         children_arr = self.get_array_def()
         controller_arr = self.get_array_def()
         controller_data_arr = self.get_array_def()
@@ -659,56 +730,49 @@ class MdlLoader:
             supernode = self.node_by_number[node_number]
             controllers = self.load_controllers(controller_arr, controller_data_arr)
             if CTRL_BASE_POSITION in controllers:
-                node.keyframes["position"] = [row[:4] for row in controllers[CTRL_BASE_POSITION]]
+                node.keyframes["position"] = self.new_keyframe_list(controllers[CTRL_BASE_POSITION], 3)
             if CTRL_BASE_ORIENTATION in controllers:
-                orientations = [self.orientation_controller_to_quaternion(row[1:]) for row in controllers[CTRL_BASE_ORIENTATION]]
-                node.keyframes["orientation"] = [[row[0]] + orientations[i] for i, row in enumerate(controllers[CTRL_BASE_ORIENTATION])]
+                rows = controllers[CTRL_BASE_ORIENTATION]
+                node.keyframes["orientation"] = KeyframeList(rows[:, 0], self.orientation_controller_to_quaternion(rows[:, 1:]))
             if isinstance(supernode, TrimeshNode):
                 if CTRL_MESH_ALPHA in controllers:
-                    node.keyframes["alpha"] = [row[:2] for row in controllers[CTRL_MESH_ALPHA]]
+                    node.keyframes["alpha"] = self.new_keyframe_list(controllers[CTRL_MESH_ALPHA], 1)
                 if CTRL_MESH_SCALE in controllers:
-                    node.keyframes["scale"] = [row[:2] for row in controllers[CTRL_MESH_SCALE]]
+                    node.keyframes["scale"] = self.new_keyframe_list(controllers[CTRL_MESH_SCALE], 1)
                 if CTRL_MESH_SELFILLUMCOLOR in controllers:
-                    node.keyframes["selfillumcolor"] = [row[:4] for row in controllers[CTRL_MESH_SELFILLUMCOLOR]]
+                    node.keyframes["selfillumcolor"] = self.new_keyframe_list(controllers[CTRL_MESH_SELFILLUMCOLOR], 3)
             if isinstance(supernode, LightNode):
                 if CTRL_LIGHT_RADIUS in controllers:
-                    node.keyframes["radius"] = [row[:2] for row in controllers[CTRL_LIGHT_RADIUS]]
+                    node.keyframes["radius"] = self.new_keyframe_list(controllers[CTRL_LIGHT_RADIUS], 1)
                 if CTRL_LIGHT_MULTIPLIER in controllers:
-                    node.keyframes["multiplier"] = [row[:2] for row in controllers[CTRL_LIGHT_MULTIPLIER]]
+                    node.keyframes["multiplier"] = self.new_keyframe_list(controllers[CTRL_LIGHT_MULTIPLIER], 1)
                 if CTRL_LIGHT_COLOR in controllers:
-                    node.keyframes["color"] = [row[:4] for row in controllers[CTRL_LIGHT_COLOR]]
+                    node.keyframes["color"] = self.new_keyframe_list(controllers[CTRL_LIGHT_COLOR], 3)
             if isinstance(supernode, EmitterNode):
                 for key in EMITTER_CONTROLLER_KEYS:
                     if not key[0] in controllers:
                         continue
                     num_columns = key[2]
-                    node.keyframes[key[1]] = [row[:num_columns+1] for row in controllers[key[0]]]
+                    node.keyframes[key[1]] = self.new_keyframe_list(controllers[key[0]], num_columns)
+        node.animated = bool(node.keyframes)
 
         self.mdl.seek(MDL_OFFSET + children_arr.offset)
-        child_offsets = [self.mdl.get_uint32() for _ in range(children_arr.count)]
+        child_offsets = self.mdl.get_uint32s(children_arr.count)
         for off_child in child_offsets:
             child = self.load_anim_nodes(off_child, anim, node)
+            if not node.animated and child.animated:
+                node.animated = True
             node.children.append(child)
 
         return node
 
     def load_controllers(self, controller_arr, controller_data_arr):
         self.mdl.seek(MDL_OFFSET + controller_arr.offset)
-        keys = []
-        for _ in range(controller_arr.count):
-            ctrl_type = self.mdl.get_uint32()
-            self.mdl.skip(2)  # unknown
-            num_rows = self.mdl.get_uint16()
-            timekeys_start = self.mdl.get_uint16()
-            values_start = self.mdl.get_uint16()
-            num_columns = self.mdl.get_uint8()
-            self.mdl.skip(3)  # padding
-            keys.append(ControllerKey(ctrl_type, num_rows, timekeys_start, values_start, num_columns))
-        controllers = dict()
+        keys = [ControllerKey(*values) for values in self.mdl.get_records(self.controller_key_record, controller_arr.count)]
+
+        layouts = []
+        data_size = controller_data_arr.count
         for key in keys:
-            self.mdl.seek(MDL_OFFSET + controller_data_arr.offset + 4 * key.timekeys_start)
-            timekeys = [self.mdl.get_float() for _ in range(key.num_rows)]
-            self.mdl.seek(MDL_OFFSET + controller_data_arr.offset + 4 * key.values_start)
             if key.ctrl_type == CTRL_BASE_ORIENTATION and key.num_columns == 2:
                 integral = True
                 num_columns = 1
@@ -718,10 +782,29 @@ class MdlLoader:
                 bezier = key.num_columns & CTRL_FLAG_BEZIER
                 if bezier:
                     num_columns *= 3
-            values = [self.mdl.get_uint32() if integral else self.mdl.get_float() for _ in range(num_columns * key.num_rows)]
-            controllers[key.ctrl_type] = [[timekeys[i]] + values[i*num_columns:i*num_columns+num_columns] for i in range(key.num_rows)]
+            layouts.append((key, integral, num_columns))
+            data_size = max(data_size, key.timekeys_start + key.num_rows, key.values_start + num_columns * key.num_rows)
+
+        # Controller data is read once and sliced into one row per keyframe,
+        # timekey first
+        self.mdl.seek(MDL_OFFSET + controller_data_arr.offset)
+        data = self.mdl.get_bytes(4 * data_size)
+        floats = np.frombuffer(data, "<f4")
+        uints = np.frombuffer(data, "<u4")
+
+        controllers = dict()
+        for key, integral, num_columns in layouts:
+            timekeys = floats[key.timekeys_start:key.timekeys_start + key.num_rows]
+            values = (uints if integral else floats)[key.values_start:key.values_start + num_columns * key.num_rows]
+            rows = np.empty((key.num_rows, 1 + num_columns))
+            rows[:, 0] = timekeys
+            rows[:, 1:] = values.reshape((key.num_rows, num_columns))
+            controllers[key.ctrl_type] = rows
         return controllers
 
+    def new_keyframe_list(self, rows, num_columns):
+        return KeyframeList(rows[:, 0], rows[:, 1:1+num_columns])
+
     def get_node_type(self, flags):
         if flags & NODE_SABER:
             return NodeType.LIGHTSABER
@@ -759,49 +842,41 @@ class MdlLoader:
             raise RuntimeError("Invalid node type")
 
     def orientation_controller_to_quaternion(self, values):
-        num_columns = len(values)
+        num_columns = values.shape[1]
         if num_columns == 4:
-            return [values[3], *values[0:3]]
+            return values[:, [3, 0, 1, 2]]
         elif num_columns == 1:
-            comp = values[0]
-            x = ((comp & 0x7ff) / 1023.0) - 1.0
-            y = (((comp >> 11) & 0x7ff) / 1023.0) - 1.0
-            z = ((comp >> 22) / 511.0) - 1.0
+            comps = values[:, 0].astype(np.int64)
+            x = ((comps & 0x7ff) / 1023.0) - 1.0
+            y = (((comps >> 11) & 0x7ff) / 1023.0) - 1.0
+            z = ((comps >> 22) / 511.0) - 1.0
             mag2 = x * x + y * y + z * z
-            if mag2 < 1.0:
-                w = sqrt(1.0 - mag2)
-            else:
-                w = 0.0
-            return [w, x, y, z]
+            w = np.sqrt(np.where(mag2 < 1.0, 1.0 - mag2, 0.0))
+            return np.stack((w, x, y, z), axis=1)
         else:
             raise RuntimeError("Unsupported number of orientation columns: " + str(num_columns))
 
     def get_array_def(self):
-        offset = self.mdl.get_uint32()
-        count1 = self.mdl.get_uint32()
-        count2 = self.mdl.get_uint32()
+        offset, count1, count2 = self.mdl.get_record(self.array_def_record)
         if count1 != count2:
             raise RuntimeError("Array count mismatch: count1={}, count2={}".format(count1, count2))
 
         return ArrayDefinition(offset, count1)
 
-    def decompress_vector_xbox(self, comp):
-        tmp = comp & 0x7ff
-        if tmp < 1024:
-            x = tmp / 1023.0
-        else:
-            x = (tmp - 2047) / 1023.0
+    def decompress_vectors_xbox(self, comps):
+        comps = comps.astype(np.int64)
 
-        tmp = (comp >> 11) & 0x7ff
-        if tmp < 1024:
-            y = tmp / 1023.0
-        else:
-            y = (tmp - 2047) / 1023.0
+        x = comps & 0x7ff
+        x = np.where(x < 1024, x, x - 2047) / 1023.0
 
-        tmp = comp >> 22
-        if tmp < 512:
-            z = tmp / 511.0
-        else:
-            z = (tmp - 1023) / 511.0
+        y = (comps >> 11) & 0x7ff
+        y = np.where(y < 1024, y, y - 2047) / 1023.0
+
+        z = comps >> 22
+        z = np.where(z < 512, z, z - 1023) / 511.0
+
+        return np.stack((x, y, z), axis=1)
 
-        return (x, y, z)
+    def get_mdx_attribute(self, mdx_data, num_verts, stride, offset, dtype, dim):
+        dtype = np.dtype(dtype)
+        return np.ndarray((num_verts, dim), dtype, mdx_data, offset, (stride, dtype.itemsize))
@@ -18,13 +18,13 @@
 
 import os
 
-from math import sqrt
+import numpy as np
 
 from mathutils import Vector
 
-from ...defines import NodeType
+from ...defines import AabbSplit, NodeType
 
-from ... import aabb, utils
+from ... import aabb, adjacency, utils
 
 from ..binwriter import BinaryWriter
 
@@ -32,7 +32,7 @@ from .types import *
 
 
 class MdlSaver:
-    def __init__(self, path, model, tsl, xbox):
+    def __init__(self, path, model, tsl, xbox, aabb_split=AabbSplit.CENTROID, aabb_trees=None):
         self.path = path
         self.mdl = BinaryWriter(path, 'little')
 
@@ -40,9 +40,15 @@ class MdlSaver:
         mdx_path = basepath + ".mdx"
         self.mdx = BinaryWriter(mdx_path, 'little')
 
+        self.array_def_record = self.mdl.new_record("3I")
+        self.face_record = self.mdl.new_record("4fI3h3H")
+        self.controller_key_record = self.mdl.new_record("IHHHHB3x")
+
         self.model = model
         self.tsl = tsl
         self.xbox = xbox
+        self.aabb_split = aabb_split
+        self.aabb_trees = aabb_trees if aabb_trees else aabb.AabbTreeCache()
 
         # Model
         self.mdl_pos = 0
@@ -135,6 +141,9 @@ class MdlSaver:
         self.save_animations()
         self.save_nodes()
 
+        self.mdl.save()
+        self.mdx.save()
+
     def peek_model(self):
         self.mdl_pos = 80 + 116  # geometry header + model header
         self.off_name_offsets = self.mdl_pos
@@ -231,6 +240,7 @@ class MdlSaver:
                 ctrl_keys = []
                 ctrl_data = []
                 self.peek_anim_controllers(node, type_flags, ctrl_keys, ctrl_data)
+                ctrl_data = np.concatenate(ctrl_data) if ctrl_data else np.zeros(0, np.float32)
                 ctrl_count = len(ctrl_keys)
                 ctrl_data_count = len(ctrl_data)
                 self.anim_controller_keys[anim_idx].append(ctrl_keys)
@@ -354,10 +364,10 @@ class MdlSaver:
                     else:
                         self.mdx_pos += 4 * 3 * (num_verts + 1)
                     # UV1
-                    if node.uv1:
+                    if len(node.uv1) > 0:
                         self.mdx_pos += 4 * 2 * (num_verts + 1)
                     # UV2
-                    if node.uv2:
+                    if len(node.uv2) > 0:
                         self.mdx_pos += 4 * 2 * (num_verts + 1)
                     # Tangent Space
                     if node.tangentspace:
@@ -371,38 +381,25 @@ class MdlSaver:
                         else:
                             self.mdx_pos += 4 * 8 * (num_verts + 1)
 
-                # Bounding Box, Average, Total Area
-                bb_min = Vector()
-                bb_max = Vector()
-                average = Vector()
-                total_area = 0.0
-                for face in node.facelist.vertices:
-                    verts = [Vector(node.verts[i]) for i in face]
-                    for vert in verts:
-                        bb_min.x = min(bb_min.x, vert.x)
-                        bb_min.y = min(bb_min.y, vert.y)
-                        bb_min.z = min(bb_min.z, vert.z)
-                        bb_max.x = max(bb_max.x, vert.x)
-                        bb_max.y = max(bb_max.y, vert.y)
-                        bb_max.z = max(bb_max.z, vert.z)
-                        average += vert
-                    edge1 = verts[1] - verts[0]
-                    edge2 = verts[2] - verts[0]
-                    edge3 = verts[2] - verts[1]
-                    area = self.calculate_face_area(edge1, edge2, edge3)
-                    if area != 1.0:
-                        total_area += area
-                average /= 3 * len(node.facelist.vertices)
-                self.mesh_bounding_boxes[node_idx] = [*bb_min, *bb_max]
-                self.mesh_averages[node_idx] = [*average]
+                # Bounding Box, Average, Total Area, Radius
+                faces = np.asarray(node.facelist.vertices, dtype=np.int64).reshape((-1, 3))
+                if len(faces) > 0:
+                    face_verts = np.asarray(node.verts, dtype=np.float64)[faces]
+                    corners = face_verts.reshape((-1, 3))
+                    # Bounding box always contains the origin
+                    bb_min = np.minimum(corners.min(axis=0), 0.0)
+                    bb_max = np.maximum(corners.max(axis=0), 0.0)
+                    average = corners.sum(axis=0) / len(corners)
+                    areas = self.calculate_face_areas(face_verts)
+                    total_area = float(areas[areas != 1.0].sum())
+                    radius = max(0.0, float(np.linalg.norm(corners - average, axis=1).max()))
+                else:
+                    bb_min = bb_max = average = np.zeros(3)
+                    total_area = 0.0
+                    radius = 0.0
+                self.mesh_bounding_boxes[node_idx] = [*bb_min.tolist(), *bb_max.tolist()]
+                self.mesh_averages[node_idx] = average.tolist()
                 self.mesh_total_areas[node_idx] = total_area
-
-                # Radius
-                radius = 0.0
-                for face in node.facelist.vertices:
-                    verts = [Vector(node.verts[i]) for i in face]
-                    for vert in verts:
-                        radius = max(radius, (vert - average).length)
                 self.mesh_radii[node_idx] = radius
 
             # Skin Data
@@ -562,14 +559,11 @@ class MdlSaver:
             keyframes = node.keyframes[key]
             num_rows = len(keyframes)
             out_keys.append(ControllerKey(ctrl_type, num_rows, data_count, data_count + num_rows, num_columns))
-            for i in range(num_rows):
-                out_data.append(keyframes[i][0])  # timekey
-            for i in range(num_rows):
-                values = keyframes[i][1:1+num_columns]
-                if converter:
-                    values = converter(values)
-                for val in values:
-                    out_data.append(val)
+            values = keyframes.values[:, :num_columns]
+            if converter:
+                values = converter(values)
+            out_data.append(keyframes.times)
+            out_data.append(values.ravel())
             return data_count + (1 + num_columns) * num_rows
 
         if not node.parent:
@@ -580,7 +574,7 @@ class MdlSaver:
         # Base Controllers
 
         data_count = append_keyframes("position", CTRL_BASE_POSITION, 3, data_count)
-        data_count = append_keyframes("orientation", CTRL_BASE_ORIENTATION, 4, data_count, lambda values: [*values[1:4], values[0]])
+        data_count = append_keyframes("orientation", CTRL_BASE_ORIENTATION, 4, data_count, lambda values: values[:, [1, 2, 3, 0]])
 
         # Mesh Controllers
 
@@ -667,8 +661,7 @@ class MdlSaver:
         self.mdl.put_uint32(num_child_models)
         self.put_array_def(self.off_anim_offsets, len(self.model.animations))  # animation offsets
         self.mdl.put_uint32(supermodel_ref)
-        for val in bounding_box:
-            self.mdl.put_float(val)
+        self.mdl.put_floats(bounding_box)
         self.mdl.put_float(radius)
         self.mdl.put_float(scale)
         self.mdl.put_string(supermodel_name)
@@ -679,14 +672,12 @@ class MdlSaver:
         self.put_array_def(self.off_name_offsets, len(self.nodes))  # name offsets
 
     def save_names(self):
-        for offset in self.name_offsets:
-            self.mdl.put_uint32(offset)
+        self.mdl.put_uint32s(self.name_offsets)
         for node in self.nodes:
             self.mdl.put_c_string(node.name)
 
     def save_animations(self):
-        for offset in self.anim_offsets:
-            self.mdl.put_uint32(offset)
+        self.mdl.put_uint32s(self.anim_offsets)
 
         for anim_idx, anim in enumerate(self.model.animations):
             if self.tsl:
@@ -753,10 +744,8 @@ class MdlSaver:
             self.mdl.put_uint16(0)  # padding
             self.mdl.put_uint32(off_root)
             self.mdl.put_uint32(off_parent)
-            for val in position:
-                self.mdl.put_float(val)
-            for val in orientation:
-                self.mdl.put_float(val)
+            self.mdl.put_floats(position)
+            self.mdl.put_floats(orientation)
             self.put_array_def(self.anim_children_offsets[anim_idx][node_idx], len(child_indices))
             self.put_array_def(self.anim_controller_offsets[anim_idx][node_idx], self.anim_controller_counts[anim_idx][node_idx])
             self.put_array_def(self.anim_controller_data_offsets[anim_idx][node_idx], self.anim_controller_data_counts[anim_idx][node_idx])
@@ -774,20 +763,17 @@ class MdlSaver:
                 else:
                     unk1 = 0xffff
 
-                self.mdl.put_uint32(key.ctrl_type)
-                self.mdl.put_uint16(unk1)
-                self.mdl.put_uint16(key.num_rows)
-                self.mdl.put_uint16(key.timekeys_start)
-                self.mdl.put_uint16(key.values_start)
-                self.mdl.put_uint8(key.num_columns)
-
-                for _ in range(3):
-                    self.mdl.put_uint8(0)  # padding
+                self.mdl.put_record(self.controller_key_record,
+                                    key.ctrl_type,
+                                    unk1,
+                                    key.num_rows,
+                                    key.timekeys_start,
+                                    key.values_start,
+                                    key.num_columns)
 
             # Controller Data
 
-            for val in self.anim_controller_data[anim_idx][node_idx]:
-                self.mdl.put_float(val)
+            self.mdl.put_floats(self.anim_controller_data[anim_idx][node_idx])
 
     def save_nodes(self):
         num_meshes = 0
@@ -811,10 +797,8 @@ class MdlSaver:
             self.mdl.put_uint16(0)  # padding
             self.mdl.put_uint32(off_root)
             self.mdl.put_uint32(off_parent)
-            for val in position:
-                self.mdl.put_float(val)
-            for val in orientation:
-                self.mdl.put_float(val)
+            self.mdl.put_floats(position)
+            self.mdl.put_floats(orientation)
             self.put_array_def(self.children_offsets[node_idx], len(child_indices))
             self.put_array_def(self.controller_offsets[node_idx], self.controller_counts[node_idx])
             self.put_array_def(self.controller_data_offsets[node_idx], self.controller_data_counts[node_idx])
@@ -847,13 +831,10 @@ class MdlSaver:
 
                 # Lens Flares
                 if node.lensflares:
-                    for size in node.flare_list.sizes:
-                        self.mdl.put_float(size)
-                    for position in node.flare_list.positions:
-                        self.mdl.put_float(position)
+                    self.mdl.put_floats(node.flare_list.sizes)
+                    self.mdl.put_floats(node.flare_list.positions)
                     for colorshift in node.flare_list.colorshifts:
-                        for val in colorshift:
-                            self.mdl.put_float(val)
+                        self.mdl.put_floats(colorshift)
                     for i in range(len(node.flare_list.textures)):
                         off_tex = self.flare_textures_offsets[node_idx][i]
                         self.mdl.put_uint32(off_tex)
@@ -976,12 +957,12 @@ class MdlSaver:
                     else:
                         mdx_data_size += 4 * 3
                     # UV1
-                    if node.uv1:
+                    if len(node.uv1) > 0:
                         mdx_data_bitmap |= MDX_FLAG_UV1
                         off_mdx_uv1 = mdx_data_size
                         mdx_data_size += 4 * 2
                     # UV2
-                    if node.uv2:
+                    if len(node.uv2) > 0:
                         mdx_data_bitmap |= MDX_FLAG_UV2
                         off_mdx_uv2 = mdx_data_size
                         mdx_data_size += 4 * 2
@@ -1020,9 +1001,9 @@ class MdlSaver:
                 num_faces = len(node.facelist.vertices)
 
                 num_textures = 0
-                if node.uv1:
+                if len(node.uv1) > 0:
                     num_textures += 1
-                if node.uv2:
+                if len(node.uv2) > 0:
                     num_textures += 1
 
                 has_lightmap = node.lightmapped
@@ -1043,15 +1024,11 @@ class MdlSaver:
                 self.mdl.put_uint32(fn_ptr1)
                 self.mdl.put_uint32(fn_ptr2)
                 self.put_array_def(self.faces_offsets[node_idx], num_faces)  # faces
-                for val in bounding_box:
-                    self.mdl.put_float(val)
+                self.mdl.put_floats(bounding_box)
                 self.mdl.put_float(radius)
-                for val in average:
-                    self.mdl.put_float(val)
-                for val in diffuse:
-                    self.mdl.put_float(val)
-                for val in ambient:
-                    self.mdl.put_float(val)
+                self.mdl.put_floats(average)
+                self.mdl.put_floats(diffuse)
+                self.mdl.put_floats(ambient)
                 self.mdl.put_uint32(transparency_hint)
                 self.mdl.put_string(bitmap)
                 self.mdl.put_string(bitmap2)
@@ -1189,31 +1166,7 @@ class MdlSaver:
 
             if type_flags & NODE_MESH:
                 # Face Adjacencies
-                face_adjacencies = []
-                for face_idx in range(num_faces):
-                    face_adjacencies.append([-1, -1, -1])
-                for face_idx, face in enumerate(node.facelist.vertices):
-                    edges = [tuple(sorted(edge)) for edge in [(face[0], face[1]),
-                                                              (face[1], face[2]),
-                                                              (face[2], face[0])]]
-                    for other_face_idx in range(face_idx + 1, num_faces):
-                        other_face = node.facelist.vertices[other_face_idx]
-                        other_edges = [tuple(sorted(edge)) for edge in [(other_face[0], other_face[1]),
-                                                                        (other_face[1], other_face[2]),
-                                                                        (other_face[2], other_face[0])]]
-                        num_adj_faces = 0
-                        for i in range(3):
-                            if face_adjacencies[face_idx][i] != -1:
-                                num_adj_faces += 1
-                                continue
-                            for j in range(3):
-                                if edges[i] == other_edges[j]:
-                                    face_adjacencies[face_idx][i] = other_face_idx
-                                    face_adjacencies[other_face_idx][j] = face_idx
-                                    num_adj_faces += 1
-                                    break
-                        if num_adj_faces == 3:
-                            break
+                face_adjacencies = adjacency.find_adjacent_faces(node.facelist.vertices.tolist())
 
                 # Faces
                 for face_idx, face in enumerate(node.facelist.vertices):
@@ -1222,14 +1175,12 @@ class MdlSaver:
                     distance = -1.0 * (normal @ vert1)
                     material_id = node.facelist.materials[face_idx]
 
-                    for val in normal:
-                        self.mdl.put_float(val)
-                    self.mdl.put_float(distance)
-                    self.mdl.put_uint32(material_id)
-                    for val in face_adjacencies[face_idx]:
-                        self.mdl.put_int16(val)
-                    for val in face:
-                        self.mdl.put_uint16(val)
+                    self.mdl.put_record(self.face_record,
+                                        *normal,
+                                        distance,
+                                        material_id,
+                                        *face_adjacencies[face_idx],
+                                        *face)
 
                 # Vertex Indices Offset
                 if not type_flags & NODE_SABER:
@@ -1238,13 +1189,9 @@ class MdlSaver:
                 # Vertices
                 if not self.xbox:
                     if type_flags & NODE_SABER:
-                        for vert_idx in saber_vert_indices:
-                            for val in node.verts[vert_idx]:
-                                self.mdl.put_float(val)
+                        self.mdl.put_floats(node.verts[saber_vert_indices])
                     else:
-                        for vert in node.verts:
-                            for val in vert:
-                                self.mdl.put_float(val)
+                        self.mdl.put_floats(node.verts)
 
                 # Vertex Indices Count, Inverted Mesh Counter, Vertex Indices
                 if not type_flags & NODE_SABER:
@@ -1255,97 +1202,14 @@ class MdlSaver:
                     self.mdl.put_uint32(mesh_inv_count)  # inverted mesh counter
 
                     # Vertex Indices
-                    for face in node.facelist.vertices:
-                        for val in face:
-                            self.mdl.put_uint16(val)
+                    self.mdl.put_uint16s(node.facelist.vertices)
 
                 # MDX data
                 if not type_flags & NODE_SABER:
-                    for vert_idx, vert in enumerate(node.verts):
-                        for val in vert:
-                            self.mdx.put_float(val)
-                        if self.xbox:
-                            comp = self.compress_vector_xbox(node.normals[vert_idx])
-                            self.mdx.put_uint32(comp)
-                        else:
-                            for val in node.normals[vert_idx]:
-                                self.mdx.put_float(val)
-                        if node.uv1:
-                            for val in node.uv1[vert_idx]:
-                                self.mdx.put_float(val)
-                        if node.uv2:
-                            for val in node.uv2[vert_idx]:
-                                self.mdx.put_float(val)
-                        if node.tangentspace:
-                            if self.xbox:
-                                comp = self.compress_vector_xbox(node.bitangents[vert_idx])
-                                self.mdx.put_uint32(comp)
-                                comp = self.compress_vector_xbox(node.tangents[vert_idx])
-                                self.mdx.put_uint32(comp)
-                                comp = self.compress_vector_xbox(node.tangentspacenormals[vert_idx])
-                                self.mdx.put_uint32(comp)
-                            else:
-                                for val in node.bitangents[vert_idx]:
-                                    self.mdx.put_float(val)
-                                for val in node.tangents[vert_idx]:
-                                    self.mdx.put_float(val)
-                                for val in node.tangentspacenormals[vert_idx]:
-                                    self.mdx.put_float(val)
-                        if type_flags & NODE_SKIN:
-                            vert_weights = node.weights[vert_idx]
-                            bone_weights = []
-                            for bone_name, weight in vert_weights:
-                                bone_node_idx = self.node_idx_by_name[bone_name]
-                                bone_idx = bonemap[bone_node_idx]
-                                bone_weights.append((bone_idx, weight))
-                            for i in range(4):
-                                if i < len(bone_weights):
-                                    self.mdx.put_float(bone_weights[i][1])
-                                else:
-                                    self.mdx.put_float(0.0)
-                            if self.xbox:
-                                for i in range(4):
-                                    if i < len(bone_weights):
-                                        self.mdx.put_uint16(bone_weights[i][0])
-                                    else:
-                                        self.mdx.put_uint16(0xffff)
-                            else:
-                                for i in range(4):
-                                    if i < len(bone_weights):
-                                        self.mdx.put_float(float(bone_weights[i][0]))
-                                    else:
-                                        self.mdx.put_float(-1.0)
-                    # Extra MDX data
-                    for _ in range(3):
-                        self.mdx.put_float(1e+7)
-                    if self.xbox:
-                        self.mdx.put_uint32(0)
-                    else:
-                        for _ in range(3):
-                            self.mdx.put_float(0.0)
-                    if node.uv1:
-                        for _ in range(2):
-                            self.mdx.put_float(0.0)
-                    if node.uv2:
-                        for _ in range(2):
-                            self.mdx.put_float(0.0)
-                    if node.tangentspace:
-                        if self.xbox:
-                            for _ in range(3):
-                                self.mdx.put_uint32(0)
-                        else:
-                            for _ in range(9):
-                                self.mdx.put_float(0.0)
-                    if type_flags & NODE_SKIN:
-                        weights = (1.0, 0.0, 0.0, 0.0)
-                        for val in weights:
-                            self.mdx.put_float(val)
-                        if self.xbox:
-                            for _ in range(4):
-                                self.mdx.put_uint16(0)
-                        else:
-                            for _ in range(4):
-                                self.mdx.put_float(0.0)
+                    records = self.new_mdx_records(node, type_flags, bonemap if type_flags & NODE_SKIN else None)
+                    if records.dtype.itemsize != mdx_data_size:
+                        raise RuntimeError("MDX record size mismatch: expected={}, actual={}".format(mdx_data_size, records.dtype.itemsize))
+                    self.mdx.put_bytes(records.tobytes())
 
             # Skin Data
 
@@ -1384,11 +1248,9 @@ class MdlSaver:
             # Dangly Data
 
             if type_flags & NODE_DANGLY:
-                for val in node.constraints:
-                    self.mdl.put_float(val)
+                self.mdl.put_floats(node.constraints)
                 for vert in node.verts:
-                    for val in vert:
-                        self.mdl.put_float(val)
+                    self.mdl.put_floats(vert)
 
             # AABB Data
 
@@ -1418,8 +1280,7 @@ class MdlSaver:
                     most_significant_plane = switch[split_axis]
 
                     # Bounding Box
-                    for val in aabb[: 6]:
-                        self.mdl.put_float(val)
+                    self.mdl.put_floats(aabb[: 6])
 
                     self.mdl.put_uint32(off_child1)
                     self.mdl.put_uint32(off_child2)
@@ -1429,15 +1290,9 @@ class MdlSaver:
             # Saber Data
 
             if type_flags & NODE_SABER:
-                for vert_idx in saber_vert_indices:
-                    for val in node.verts[vert_idx]:
-                        self.mdl.put_float(val)
-                for vert_idx in saber_vert_indices:
-                    for val in node.uv1[vert_idx]:
-                        self.mdl.put_float(val)
-                for vert_idx in saber_vert_indices:
-                    for val in node.normals[vert_idx]:
-                        self.mdl.put_float(val)
+                self.mdl.put_floats(node.verts[saber_vert_indices])
+                self.mdl.put_floats(node.uv1[saber_vert_indices])
+                self.mdl.put_floats(node.normals[saber_vert_indices])
 
             # Children
 
@@ -1449,20 +1304,17 @@ class MdlSaver:
             for key in self.controller_keys[node_idx]:
                 unk1 = 0xffff
 
-                self.mdl.put_uint32(key.ctrl_type)
-                self.mdl.put_uint16(unk1)
-                self.mdl.put_uint16(key.num_rows)
-                self.mdl.put_uint16(key.timekeys_start)
-                self.mdl.put_uint16(key.values_start)
-                self.mdl.put_uint8(key.num_columns)
-
-                for _ in range(3):
-                    self.mdl.put_uint8(0)  # padding
+                self.mdl.put_record(self.controller_key_record,
+                                    key.ctrl_type,
+                                    unk1,
+                                    key.num_rows,
+                                    key.timekeys_start,
+                                    key.values_start,
+                                    key.num_columns)
 
             # Controller Data
 
-            for val in self.controller_data[node_idx]:
-                self.mdl.put_float(val)
+            self.mdl.put_floats(self.controller_data[node_idx])
 
     def get_node_flags(self, node):
         switch = {
@@ -1529,34 +1381,22 @@ class MdlSaver:
 
         return (fn_ptr1, fn_ptr2)
 
-    def calculate_face_area(self, edge1, edge2, edge3):
-        a = edge1.length
-        b = edge2.length
-        c = edge3.length
+    def calculate_face_areas(self, face_verts):
+        # Heron's formula, -1.0 for degenerate faces
+        a = np.linalg.norm(face_verts[:, 1] - face_verts[:, 0], axis=1)
+        b = np.linalg.norm(face_verts[:, 2] - face_verts[:, 0], axis=1)
+        c = np.linalg.norm(face_verts[:, 2] - face_verts[:, 1], axis=1)
         s = (a + b + c) / 2.0
-        if a <= 0.0 or b <= 0.0 or c <= 0.0:
-            return -1.0
-        if a > b + c or b > a + c or c > a + b:
-            return -1.0
-        area2 = s * (s - a) * (s - b) * (s - c)
-        return sqrt(area2)
+        degenerate = (a <= 0.0) | (b <= 0.0) | (c <= 0.0) | (a > b + c) | (b > a + c) | (c > a + b)
+        area2 = np.maximum(s * (s - a) * (s - b) * (s - c), 0.0)
+        return np.where(degenerate, -1.0, np.sqrt(area2))
 
     def generate_aabb_tree(self, node):
-        face_list = []
-        face_idx = 0
-
-        for face in node.facelist.vertices:
-            v0 = Vector(node.verts[face[0]])
-            v1 = Vector(node.verts[face[1]])
-            v2 = Vector(node.verts[face[2]])
-            centroid = (v0 + v1 + v2) / 3
-            face_list.append((face_idx, [v0, v1, v2], centroid))
-            face_idx += 1
-
-        aabbs = []
-        aabb.generate_tree(aabbs, face_list)
-
-        return aabbs
+        # Reuse the tree loaded from MDL as long as it still matches the faces
+        num_faces = len(node.facelist.vertices)
+        if node.aabb_tree and aabb.is_tree_valid(node.aabb_tree, num_faces):
+            return aabb.refit_tree(node.aabb_tree, node.verts, node.facelist.vertices, range(num_faces))
+        return self.aabb_trees.get_tree(node.verts, node.facelist.vertices, self.aabb_split)
 
     def get_inverted_counter(self, count):
         quo = count // 100
@@ -1564,28 +1404,80 @@ class MdlSaver:
         return int(pow(2, quo) * 100 - count + (100 * quo if mod else 0) + (0 if quo else -1))
 
     def put_array_def(self, offset, count):
-        self.mdl.put_uint32(offset)
-        self.mdl.put_uint32(count)
-        self.mdl.put_uint32(count)
-
-    def compress_vector_xbox(self, vec):
-        x, y, z = vec
-        if abs(x) > 1.0 or abs(y) > 1.0 or abs(z) > 1.0:
-            return 0
-
-        tmp = round(511.0 * z)
-        if z < 0.0:
-            tmp = 1023 + tmp
-        comp = tmp
-
-        tmp = round(1023.0 * y)
-        if y < 0.0:
-            tmp = 2047 + tmp
-        comp = (comp << 11) | tmp
-
-        tmp = round(1023.0 * x)
-        if x < 0.0:
-            tmp = 2047 + tmp
-        comp = (comp << 11) | tmp
-
-        return comp
+        self.mdl.put_record(self.array_def_record, offset, count, count)
+
+    def new_mdx_records(self, node, type_flags, bonemap=None):
+        num_verts = len(node.verts)
+
+        # Field order must match MDX offsets written to the mesh header
+        bo = self.mdx.bo_literal
+        fields = [("position", bo + "f4", (3,))]
+        if self.xbox:
+            fields.append(("normal", bo + "u4"))
+        else:
+            fields.append(("normal", bo + "f4", (3,)))
+        if len(node.uv1) > 0:
+            fields.append(("uv1", bo + "f4", (2,)))
+        if len(node.uv2) > 0:
+            fields.append(("uv2", bo + "f4", (2,)))
+        if node.tangentspace:
+            if self.xbox:
+                fields.append(("tangentspace", bo + "u4", (3,)))
+            else:
+                fields.append(("tangentspace", bo + "f4", (9,)))
+        if type_flags & NODE_SKIN:
+            fields.append(("bone_weights", bo + "f4", (4,)))
+            if self.xbox:
+                fields.append(("bone_indices", bo + "u2", (4,)))
+            else:
+                fields.append(("bone_indices", bo + "f4", (4,)))
+
+        # Extra vertex at the end is zero-filled except for position and bone weights
+        records = np.zeros(num_verts + 1, dtype=np.dtype(fields))
+        records["position"][:num_verts] = node.verts
+        records["position"][num_verts] = 1e+7
+        if self.xbox:
+            records["normal"][:num_verts] = self.compress_vectors_xbox(node.normals)
+        else:
+            records["normal"][:num_verts] = node.normals
+        if len(node.uv1) > 0:
+            records["uv1"][:num_verts] = node.uv1
+        if len(node.uv2) > 0:
+            records["uv2"][:num_verts] = node.uv2
+        if node.tangentspace:
+            if self.xbox:
+                tangentspace = [self.compress_vectors_xbox(vecs) for vecs in (node.bitangents, node.tangents, node.tangentspacenormals)]
+                records["tangentspace"][:num_verts] = np.stack(tangentspace, axis=1)
+            else:
+                tangentspace = (node.bitangents, node.tangents, node.tangentspacenormals)
+                records["tangentspace"][:num_verts] = np.concatenate(tangentspace, axis=1)
+        if type_flags & NODE_SKIN:
+            bone_weights = np.zeros((num_verts, 4), dtype=np.float32)
+            bone_indices = np.full((num_verts, 4), 0xffff if self.xbox else -1.0)
+            for vert_idx, vert_weights in enumerate(node.weights):
+                for i, (bone_name, weight) in enumerate(vert_weights[:4]):
+                    bone_weights[vert_idx, i] = weight
+                    bone_indices[vert_idx, i] = bonemap[self.node_idx_by_name[bone_name]]
+            records["bone_weights"][:num_verts] = bone_weights
+            records["bone_weights"][num_verts, 0] = 1.0
+            records["bone_indices"][:num_verts] = bone_indices
+
+        return records
+
+    def compress_vectors_xbox(self, vecs):
+        vecs = np.asarray(vecs, dtype=np.float64).reshape((-1, 3))
+
+        # Vectors with components outside of [-1, 1] are compressed to zero
+        valid = np.all(np.abs(vecs) <= 1.0, axis=1)
+        vecs = np.where(valid[:, np.newaxis], vecs, 0.0)
+
+        x = np.round(1023.0 * vecs[:, 0]).astype(np.int64)
+        x = np.where(vecs[:, 0] < 0.0, 2047 + x, x)
+
+        y = np.round(1023.0 * vecs[:, 1]).astype(np.int64)
+        y = np.where(vecs[:, 1] < 0.0, 2047 + y, y)
+
+        z = np.round(511.0 * vecs[:, 2]).astype(np.int64)
+        z = np.where(vecs[:, 2] < 0.0, 1023 + z, z)
+
+        return ((z << 22) | (y << 11) | x).astype(np.uint32)
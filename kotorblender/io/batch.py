@@ -0,0 +1,131 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import argparse
+import os
+import sys
+import traceback
+
+from ..defines import AabbSplit, ExportOptions
+from ..format.bwm.loader import BwmLoader
+from ..format.bwm.saver import BwmSaver
+from ..format.mdl.loader import MdlLoader
+from ..format.mdl.saver import MdlSaver
+
+from .. import utils
+
+BATCH_EXTENSIONS = [".mdl", ".wok", ".pwk", ".dwk"]
+
+
+def find_files(path):
+    rel_paths = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            _, ext = os.path.splitext(filename)
+            if ext.lower() in BATCH_EXTENSIONS:
+                rel_paths.append(os.path.relpath(os.path.join(dirpath, filename), path))
+    return rel_paths
+
+
+def convert_file(in_path, out_path, options, keep_aabb_trees=False):
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    base_path, ext = os.path.splitext(in_path)
+    if ext.lower() == ".mdl":
+        mdl = MdlLoader(in_path, keep_aabb_trees)
+        model = mdl.load()
+        saver = MdlSaver(out_path, model, options.export_for_tsl, options.export_for_xbox, options.aabb_split)
+        saver.save()
+    else:
+        model_name = os.path.basename(base_path)
+        if ext.lower() == ".dwk":
+            model_name = model_name[:-1]
+        bwm = BwmLoader(in_path, model_name)
+        walkmesh = bwm.load()
+        saver = BwmSaver(out_path, walkmesh, options.aabb_split)
+        saver.save()
+
+
+def try_convert_file(task):
+    in_path, out_path, options, keep_aabb_trees = task
+    try:
+        convert_file(in_path, out_path, options, keep_aabb_trees)
+        return None
+    except Exception:
+        return traceback.format_exc()
+
+
+def convert_directory(in_dir, out_dir, options, num_jobs=1, keep_aabb_trees=False):
+    rel_paths = find_files(in_dir)
+    tasks = [(os.path.join(in_dir, rel_path), os.path.join(out_dir, rel_path), options, keep_aabb_trees) for rel_path in rel_paths]
+
+    if num_jobs > 1 and len(tasks) > 1:
+        with utils.new_worker_pool(min(num_jobs, len(tasks))) as executor:
+            return report_progress(rel_paths, executor.map(try_convert_file, tasks))
+    else:
+        return report_progress(rel_paths, map(try_convert_file, tasks))
+
+
+def report_progress(rel_paths, errors):
+    # Results are consumed in input order, so output is deterministic
+    # regardless of which worker finishes first
+    failed = []
+    for idx, (rel_path, error) in enumerate(zip(rel_paths, errors)):
+        if error:
+            print("[{}/{}] Failed to convert '{}'".format(idx + 1, len(rel_paths), rel_path))
+            print(error, file=sys.stderr)
+            failed.append(rel_path)
+        else:
+            print("[{}/{}] Converted '{}'".format(idx + 1, len(rel_paths), rel_path))
+    print("Converted {} of {} files".format(len(rel_paths) - len(failed), len(rel_paths)))
+    return failed
+
+
+def main(argv=None):
+    if argv is None:
+        # Arguments after "--" are meant for the script when run from Blender
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        prog="kotorblender.io.batch",
+        description="Convert MDL, WOK, PWK and DWK files in a directory tree without creating Blender objects")
+    parser.add_argument("input", help="directory to read models and walkmeshes from")
+    parser.add_argument("output", help="directory to write converted files to, may be the same as input")
+    parser.add_argument("--tsl", action="store_true", help="use The Sith Lords MDL format")
+    parser.add_argument("--xbox", action="store_true", help="use Xbox MDL format")
+    parser.add_argument("--aabb-split", choices=[AabbSplit.CENTROID, AabbSplit.SAH],
+                        help="how to partition faces when building AABB trees, by default MDL trees are kept from input files")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="number of worker processes, defaults to the number of CPUs")
+    args = parser.parse_args(argv)
+
+    options = ExportOptions()
+    options.export_for_tsl = args.tsl
+    options.export_for_xbox = args.xbox
+    options.aabb_split = args.aabb_split or AabbSplit.CENTROID
+
+    failed = convert_directory(args.input, args.output, options, args.jobs, args.aabb_split is None)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
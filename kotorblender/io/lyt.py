@@ -18,6 +18,8 @@
 
 import os
 
+from concurrent.futures import ThreadPoolExecutor
+
 import bpy
 
 from ..defines import DummyType
@@ -53,14 +55,24 @@ def load_lyt(operator, filepath, options):
         elif tokens[0].startswith("roomcount"):
             rooms_to_read = int(tokens[1])
 
-    # Load room models
+    # Find room models
     path, _ = os.path.split(filepath)
+    room_models = []
     for room in rooms:
         mdl_path = os.path.join(path, room[0] + ".mdl")
         if not os.path.exists(mdl_path):
             operator.report({'WARNING'}, "Room model '{}' not found".format(mdl_path))
             continue
-        mdl.load_mdl(operator, mdl_path, options, room[1:])
+        room_models.append((mdl_path, room[1:]))
+
+    # Read room models in worker threads, import them into the scene in layout
+    # order on the main thread as soon as each one is read. Blender itself
+    # must not be forked, so a process pool is not an option here.
+    with ThreadPoolExecutor(max(1, min(len(room_models), os.cpu_count() or 1))) as executor:
+        futures = [executor.submit(mdl.read_mdl, mdl_path, options) for mdl_path, _ in room_models]
+        for (mdl_path, position), future in zip(room_models, futures):
+            model, xwk_walkmeshes = future.result()
+            mdl.import_mdl(operator, mdl_path, model, xwk_walkmeshes, options, position)
 
 
 def save_lyt(operator, filepath):
@@ -20,6 +20,7 @@ import os
 
 import bpy
 
+from ..aabb import AabbTreeCache
 from ..format.bwm.loader import BwmLoader
 from ..format.bwm.saver import BwmSaver
 from ..format.mdl.loader import MdlLoader
@@ -32,14 +33,23 @@ from .. import utils
 
 
 def load_mdl(operator, filepath, options, position=(0.0, 0.0, 0.0)):
-    operator.report({'INFO'}, "Loading model from '{}'".format(filepath))
-    mdl = MdlLoader(filepath)
-    model = mdl.load()
+    model, xwk_walkmeshes = read_mdl(filepath, options)
+    import_mdl(operator, filepath, model, xwk_walkmeshes, options, position)
+
+
+def read_mdl(filepath, options):
+    if not options.import_animations:
+        animation_filter = []
+    elif options.animation_filter:
+        animation_filter = options.animation_filter
+    else:
+        animation_filter = None
 
-    pwk_walkmesh = None
-    dwk_walkmesh1 = None
-    dwk_walkmesh2 = None
-    dwk_walkmesh3 = None
+    # AABB trees cannot be stored in Blender objects, so there is no point in reading them
+    mdl = MdlLoader(filepath, load_aabb_trees=False)
+    model = mdl.load(animation_filter)
+
+    xwk_walkmeshes = []
 
     if options.import_geometry and options.import_walkmeshes:
         wok_path = filepath[:-4] + ".wok"
@@ -54,33 +64,30 @@ def load_mdl(operator, filepath, options, position=(0.0, 0.0, 0.0)):
 
         pwk_path = filepath[:-4] + ".pwk"
         if os.path.exists(pwk_path):
-            operator.report({'INFO'}, "Loading walkmesh from '{}'".format(pwk_path))
             pwk = BwmLoader(pwk_path, model.name)
-            pwk_walkmesh = pwk.load()
+            xwk_walkmeshes.append((pwk_path, pwk.load()))
 
         dwk0_path = filepath[:-4] + "0.dwk"
         dwk1_path = filepath[:-4] + "1.dwk"
         dwk2_path = filepath[:-4] + "2.dwk"
         if os.path.exists(dwk0_path) and os.path.exists(dwk1_path) and os.path.exists(dwk2_path):
-            operator.report({'INFO'}, "Loading walkmesh from '{}'".format(dwk0_path))
-            dwk1 = BwmLoader(dwk0_path, model.name)
-            operator.report({'INFO'}, "Loading walkmesh from '{}'".format(dwk1_path))
-            dwk2 = BwmLoader(dwk1_path, model.name)
-            operator.report({'INFO'}, "Loading walkmesh from '{}'".format(dwk2_path))
-            dwk3 = BwmLoader(dwk2_path, model.name)
-            dwk_walkmesh1 = dwk1.load()
-            dwk_walkmesh2 = dwk2.load()
-            dwk_walkmesh3 = dwk3.load()
+            for dwk_path in [dwk0_path, dwk1_path, dwk2_path]:
+                dwk = BwmLoader(dwk_path, model.name)
+                xwk_walkmeshes.append((dwk_path, dwk.load()))
+
+    return model, xwk_walkmeshes
+
+
+def import_mdl(operator, filepath, model, xwk_walkmeshes, options, position=(0.0, 0.0, 0.0)):
+    operator.report({'INFO'}, "Loading model from '{}'".format(filepath))
+    for xwk_path, _ in xwk_walkmeshes:
+        operator.report({'INFO'}, "Loading walkmesh from '{}'".format(xwk_path))
 
     collection = bpy.context.collection
     model_root = model.import_to_collection(collection, options, position)
 
-    if pwk_walkmesh:
-        pwk_walkmesh.import_to_collection(model_root, collection, options)
-    if dwk_walkmesh1 and dwk_walkmesh2 and dwk_walkmesh3:
-        dwk_walkmesh1.import_to_collection(model_root, collection, options)
-        dwk_walkmesh2.import_to_collection(model_root, collection, options)
-        dwk_walkmesh3.import_to_collection(model_root, collection, options)
+    for _, walkmesh in xwk_walkmeshes:
+        walkmesh.import_to_collection(model_root, collection, options)
 
     # Reset Pose
     bpy.context.scene.frame_set(0)
@@ -96,10 +103,13 @@ def save_mdl(operator, filepath, options):
     if not mdl_root:
         return
 
+    # AABB trees are built once and shared by MDL and WOK
+    aabb_trees = AabbTreeCache()
+
     # Export MDL
     model = Model.from_mdl_root(mdl_root, options)
     operator.report({'INFO'}, "Saving model to '{}'".format(filepath))
-    mdl = MdlSaver(filepath, model, options.export_for_tsl, options.export_for_xbox)
+    mdl = MdlSaver(filepath, model, options.export_for_tsl, options.export_for_xbox, options.aabb_split, aabb_trees)
     mdl.save()
 
     if options.export_walkmeshes:
@@ -110,7 +120,7 @@ def save_mdl(operator, filepath, options):
             wok_path = base_path + ".wok"
             walkmesh = Walkmesh.from_aabb_node(aabb_node)
             operator.report({'INFO'}, "Saving walkmesh to '{}'".format(wok_path))
-            bwm = BwmSaver(wok_path, walkmesh)
+            bwm = BwmSaver(wok_path, walkmesh, options.aabb_split, aabb_trees)
             bwm.save()
 
         # Export PWK, DWK
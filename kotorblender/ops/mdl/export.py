@@ -22,7 +22,7 @@ import bpy
 
 from bpy_extras.io_utils import ExportHelper
 
-from ...defines import ExportOptions
+from ...defines import AabbSplit, ExportOptions
 from ...io import mdl
 
 
@@ -58,6 +58,15 @@ class KB_OT_export_mdl(bpy.types.Operator, ExportHelper):
         description="Export previously imported normals, if any",
         default=True)
 
+    aabb_split: bpy.props.EnumProperty(
+        items=[
+            (AabbSplit.CENTROID, "Centroid", "Split at the mean of face centroids", 0),
+            (AabbSplit.SAH, "Surface Area Heuristic", "Split where the summed surface area of child boxes is smallest", 1)
+        ],
+        name="AABB Tree Split",
+        description="How to partition faces when building AABB trees",
+        default=AabbSplit.CENTROID)
+
     def execute(self, context):
         options = ExportOptions()
         options.export_for_tsl = self.export_for_tsl
@@ -65,6 +74,7 @@ class KB_OT_export_mdl(bpy.types.Operator, ExportHelper):
         options.export_animations = self.export_animations
         options.export_walkmeshes = self.export_walkmeshes
         options.export_custom_normals = self.export_custom_normals
+        options.aabb_split = self.aabb_split
 
         try:
             mdl.save_mdl(self, self.filepath, options)
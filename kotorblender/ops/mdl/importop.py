@@ -50,6 +50,11 @@ class KB_OT_import_mdl(bpy.types.Operator, ImportHelper):
         name="Import Animations",
         default=True)
 
+    animation_filter: bpy.props.StringProperty(
+        name="Animation Filter",
+        description="Comma-separated list of animation names to import, wildcards allowed. Leave empty to import all animations",
+        default="")
+
     import_walkmeshes: bpy.props.BoolProperty(
         name="Import Walkmeshes",
         description="Import area, door and placeable walkmeshes",
@@ -89,6 +94,7 @@ class KB_OT_import_mdl(bpy.types.Operator, ImportHelper):
         options = ImportOptions()
         options.import_geometry = self.import_geometry
         options.import_animations = self.import_animations
+        options.animation_filter = [name.strip() for name in self.animation_filter.split(",") if name.strip()]
         options.import_walkmeshes = self.import_walkmeshes
         options.build_materials = self.build_materials
         options.build_armature = self.build_armature
@@ -27,6 +27,7 @@ from .animnode import AnimationNode
 
 
 class Animation:
+    __slots__ = ("name", "length", "transtime", "animroot", "root_node", "events")
 
     def __init__(self, name="UNNAMED"):
         self.name = name
@@ -37,23 +38,25 @@ class Animation:
 
         self.events = []
 
-    def add_to_objects(self, mdl_root, animscale):
+    def add_to_objects(self, mdl_root, animscale, objects_by_node_number=None, keyframe_writer=None):
         list_anim = Animation.append_to_object(mdl_root, self.name, self.length, self.transtime, self.animroot)
         for time, name in self.events:
             Animation.append_event_to_object_anim(list_anim, name, time)
 
-        self.add_nodes_to_objects(list_anim, self.root_node, mdl_root, animscale)
+        if objects_by_node_number is None:
+            objects_by_node_number = utils.find_objects_by_node_number(mdl_root)
+        self.add_nodes_to_objects(list_anim, self.root_node, mdl_root, animscale, objects_by_node_number, keyframe_writer)
 
-    def add_nodes_to_objects(self, anim, node, mdl_root, animscale, below_animroot=False):
-        obj = utils.find_object(mdl_root, lambda o: o.kb.node_number == node.node_number)
+    def add_nodes_to_objects(self, anim, node, mdl_root, animscale, objects_by_node_number, keyframe_writer=None, below_animroot=False):
+        obj = objects_by_node_number.get(node.node_number)
         if obj:
             if not below_animroot and obj.name.lower() == mdl_root.kb.animroot.lower():
                 below_animroot = True
             if below_animroot:
-                node.add_keyframes_to_object(anim, obj, mdl_root.name, animscale)
+                node.add_keyframes_to_object(anim, obj, mdl_root.name, animscale, keyframe_writer)
 
         for child in node.children:
-            self.add_nodes_to_objects(anim, child, mdl_root, animscale, below_animroot)
+            self.add_nodes_to_objects(anim, child, mdl_root, animscale, objects_by_node_number, keyframe_writer, below_animroot)
 
     @classmethod
     def append_to_object(cls, mdl_root, name, length=0.0, transtime=0.25, animroot=defines.NULL):
@@ -81,12 +84,12 @@ class Animation:
         return int(math.ceil((last_frame + defines.ANIM_PADDING) / 10.0)) * 10
 
     @classmethod
-    def from_list_anim(cls, list_anim, mdl_root):
+    def from_list_anim(cls, list_anim, mdl_root, keyframe_index=None):
         anim = Animation(list_anim.name)
         anim.length = Animation.frame_to_time(list_anim.frame_end - list_anim.frame_start)
         anim.transtime = list_anim.transtime
         anim.animroot = list_anim.root
-        anim.root_node = Animation.animation_node_from_object(list_anim, mdl_root)
+        anim.root_node = Animation.animation_node_from_object(list_anim, mdl_root, keyframe_index=keyframe_index)
 
         for event in list_anim.event_list:
             time = Animation.frame_to_time(event.frame - list_anim.frame_start)
@@ -96,7 +99,7 @@ class Animation:
         return anim
 
     @classmethod
-    def animation_node_from_object(cls, anim, obj, parent=None):
+    def animation_node_from_object(cls, anim, obj, parent=None, keyframe_index=None):
         name = obj.name
         if re.match(r".+\.\d{3}$", name):
             name = name[:-4]
@@ -105,15 +108,15 @@ class Animation:
         node.node_number = obj.kb.node_number
         node.parent = parent
 
-        node.load_keyframes_from_object(anim, obj)
+        node.load_keyframes_from_object(anim, obj, keyframe_index)
         if obj.type == 'LIGHT':
-            node.load_keyframes_from_object(anim, obj.data)
+            node.load_keyframes_from_object(anim, obj.data, keyframe_index)
         node.animated = bool(node.keyframes)
 
         for child_obj in sorted(obj.children, key=lambda o: o.kb.export_order):
             if child_obj.type == 'EMPTY' and child_obj.kb.dummytype in [DummyType.PWKROOT, DummyType.DWKROOT]:
                 continue
-            child = Animation.animation_node_from_object(anim, child_obj, node)
+            child = Animation.animation_node_from_object(anim, child_obj, node, keyframe_index)
             if not node.animated and child.animated:
                 node.animated = True
             node.children.append(child)
@@ -18,6 +18,8 @@
 
 import bpy
 
+import numpy as np
+
 from ..defines import NodeType
 
 from .. import defines
@@ -88,18 +90,76 @@ DATA_PATH_BY_LABEL = {
 
 LABEL_BY_DATA_PATH = {value: key for key, value in DATA_PATH_BY_LABEL.items()}
 
+# Keyframe points less than 1/KEYFRAME_MERGE_PRECISION frames apart share a frame
+KEYFRAME_MERGE_PRECISION = 100
+
 CONVERTER_BY_LABEL = {
-    "position": lambda val, obj, animscale: [obj.location[i] + animscale * val[i] for i in range(3)],
-    "scale": lambda val, obj, animscale: [val[0], val[0], val[0]]
+    "position": lambda values, obj, animscale: np.asarray(obj.location) + animscale * values,
+    "scale": lambda values, obj, animscale: np.repeat(values[:, :1], 3, axis=1)
 }
 
 CONVERTER_BY_DATA_PATH = {
-    "location": lambda val, obj: [val[i] - obj.location[i] for i in range(3)],
-    "scale": lambda val, obj: [val[0]]
+    "location": lambda values, obj: values - np.asarray(obj.location),
+    "scale": lambda values, obj: values[:, :1]
 }
 
 
+class KeyframeList:
+    __slots__ = ("times", "values")
+
+    def __init__(self, times=(), values=()):
+        self.times = np.asarray(times, dtype=np.float32)  # timekeys in seconds
+        self.values = np.asarray(values, dtype=np.float32)  # one row per timekey
+        if self.values.ndim == 1:
+            self.values = self.values.reshape((-1, 1))
+
+    def __len__(self):
+        return len(self.times)
+
+
+class KeyframeIndex:
+    def __init__(self):
+        self.fcurves_by_action = dict()
+
+    def get_fcurves(self, action):
+        if action.name not in self.fcurves_by_action:
+            self.fcurves_by_action[action.name] = KeyframeIndex.read_fcurves(action)
+        return self.fcurves_by_action[action.name]
+
+    @classmethod
+    def read_fcurves(cls, action):
+        fcurves = []
+        for fcurve in action.fcurves:
+            keyframe_points = fcurve.keyframe_points
+            co = np.empty(2 * len(keyframe_points), dtype=np.float32)
+            keyframe_points.foreach_get("co", co)
+            frames = np.round(co[0::2]).astype(np.int64)
+            order = np.argsort(frames, kind="stable")
+            fcurves.append((fcurve.data_path, fcurve.array_index, frames[order], co[1::2][order]))
+        return fcurves
+
+
+class KeyframeWriter:
+    def __init__(self):
+        self.points_by_fcurve = dict()
+
+    def add_keyframe_points(self, fcurve, frames, values):
+        key = (fcurve.id_data.name, fcurve.data_path, fcurve.array_index)
+        if key not in self.points_by_fcurve:
+            self.points_by_fcurve[key] = (fcurve, [], [])
+        _, fcurve_frames, fcurve_values = self.points_by_fcurve[key]
+        fcurve_frames.append(frames)
+        fcurve_values.append(values)
+
+    def write(self):
+        # Points of all animations are written to each F-curve at once
+        for fcurve, frames, values in self.points_by_fcurve.values():
+            AnimationNode.add_keyframe_points(fcurve, np.concatenate(frames), np.concatenate(values))
+        self.points_by_fcurve.clear()
+
+
 class AnimationNode:
+    __slots__ = ("nodetype", "name", "node_number", "parent", "children", "keyframes", "animated")
 
     def __init__(self, name="UNNAMED"):
         self.nodetype = NodeType.DUMMY
@@ -111,7 +171,7 @@ class AnimationNode:
 
         self.animated = False  # this node or its children contain keyframes
 
-    def add_keyframes_to_object(self, anim, obj, root_name, animscale):
+    def add_keyframes_to_object(self, anim, obj, root_name, animscale, keyframe_writer=None):
         for label, data in self.keyframes.items():
             if label not in DATA_PATH_BY_LABEL or not data:
                 continue
@@ -130,42 +190,35 @@ class AnimationNode:
 
             # Convert keyframes to frames/values
 
-            frames = [anim.frame_start + defines.FPS * d[0] for d in data]
+            frames = anim.frame_start + defines.FPS * data.times.astype(np.float64)
 
+            values = data.values.astype(np.float64)
             if label in CONVERTER_BY_LABEL:
                 converter = CONVERTER_BY_LABEL[label]
-                values = [converter(d[1:], obj, animscale) for d in data]
-            else:
-                values = [d[1:] for d in data]
+                values = converter(values, obj, animscale)
 
-            dim = len(values[0])
-
-            # Keyframe Points
-
-            data_path = DATA_PATH_BY_LABEL[label]
-            fcurves = [self.get_or_create_fcurve(action, data_path, i) for i in range(dim)]
-            keyframe_points = [fcurve.keyframe_points for fcurve in fcurves]
+            dim = values.shape[1]
 
             # Rest Pose Keyframes
 
+            data_path = DATA_PATH_BY_LABEL[label]
             if data_path.startswith("kb."):
                 rest_values = getattr(target.kb, data_path[3:])
             else:
                 rest_values = getattr(target, data_path)
             rest_frame = anim.frame_start - defines.ANIM_REST_POSE_OFFSET
-            if dim == 1:
-                keyframe_points[0].insert(rest_frame, rest_values, options={'FAST'})
-            else:
-                for i in range(dim):
-                    keyframe_points[i].insert(rest_frame, rest_values[i], options={'FAST'})
 
-            # Animation Keyframes
+            frames = np.concatenate(([rest_frame], frames))
+            values = np.concatenate((np.reshape(rest_values, (1, dim)), values))
 
-            for frame, val in zip(frames, values):
-                for i in range(dim):
-                    keyframe_points[i].insert(frame, val[i], options={'FAST'})
-            for kfp in keyframe_points:
-                kfp.update()
+            # Keyframe Points
+
+            for i in range(dim):
+                fcurve = self.get_or_create_fcurve(action, data_path, i)
+                if keyframe_writer:
+                    keyframe_writer.add_keyframe_points(fcurve, frames, values[:, i])
+                else:
+                    self.add_keyframe_points(fcurve, frames, values[:, i])
 
     def get_or_create_action(self, name):
         if name in bpy.data.actions:
@@ -186,7 +239,61 @@ class AnimationNode:
             fcurve = action.fcurves.new(data_path=data_path, index=index)
         return fcurve
 
-    def load_keyframes_from_object(self, anim, target):
+    @classmethod
+    def add_keyframe_points(cls, fcurve, frames, values):
+        keyframe_points = fcurve.keyframe_points
+        num_points = len(keyframe_points)
+        num_total = num_points + len(frames)
+
+        # Existing keyframe points must be set again along with new ones
+        co = np.empty(2 * num_total, dtype=np.float32)
+        keyframe_points.foreach_get("co", co[:2 * num_points])
+        co[2 * num_points::2] = frames
+        co[2 * num_points + 1::2] = values
+
+        # Emulate keyframe_points.insert, which uses interpolation and handle
+        # types from user preferences
+        interpolation, handle_type = cls.get_new_interpolation_and_handle_type()
+        point_props = dict()
+        for prop_name, new_value in [
+                ("interpolation", interpolation),
+                ("handle_left_type", handle_type),
+                ("handle_right_type", handle_type)]:
+            prop_values = np.empty(num_total, dtype=np.int32)
+            keyframe_points.foreach_get(prop_name, prop_values[:num_points])
+            prop_values[num_points:] = new_value
+            point_props[prop_name] = prop_values
+
+        # Like keyframe_points.insert, replace the value of a keyframe point
+        # at the same frame, keeping its frame, interpolation and handle types,
+        # so that the last value wins
+        all_frames = co[0::2]
+        frame_keys = np.round(all_frames * KEYFRAME_MERGE_PRECISION)
+        _, first = np.unique(frame_keys, return_index=True)
+        _, last = np.unique(frame_keys[::-1], return_index=True)
+        last = num_total - 1 - last
+        num_unique = len(first)
+        co = np.stack((all_frames[first], co[1::2][last]), axis=1).ravel()
+
+        if num_unique > num_points:
+            keyframe_points.add(num_unique - num_points)
+        else:
+            while len(keyframe_points) > num_unique:
+                keyframe_points.remove(keyframe_points[-1], fast=True)
+        keyframe_points.foreach_set("co", co)
+        for prop_name, prop_values in point_props.items():
+            keyframe_points.foreach_set(prop_name, prop_values[first])
+        fcurve.update()
+
+    @classmethod
+    def get_new_interpolation_and_handle_type(cls):
+        edit_prefs = bpy.context.preferences.edit
+        keyframe_props = bpy.types.Keyframe.bl_rna.properties
+        interpolation = keyframe_props["interpolation"].enum_items[edit_prefs.keyframe_new_interpolation_type].value
+        handle_type = keyframe_props["handle_left_type"].enum_items[edit_prefs.keyframe_new_handle_type].value
+        return interpolation, handle_type
+
+    def load_keyframes_from_object(self, anim, target, keyframe_index=None):
         anim_data = target.animation_data
         if not anim_data:
             return
@@ -195,7 +302,7 @@ class AnimationNode:
         if not action:
             return
 
-        keyframes = self.get_keyframes_in_range(action, anim.frame_start, anim.frame_end)
+        keyframes = self.get_keyframes_in_range(action, anim.frame_start, anim.frame_end, keyframe_index)
         flat_keyframes = self.flatten_keyframes(keyframes)
 
         for data_path, dp_keyframes in flat_keyframes.items():
@@ -203,35 +310,36 @@ class AnimationNode:
                 continue
 
             label = LABEL_BY_DATA_PATH[data_path]
-            self.keyframes[label] = []
+            points = np.array(dp_keyframes, dtype=np.float64)
+            times = (points[:, 0] - anim.frame_start) / defines.FPS
+            values = points[:, 1:]
+            if data_path in CONVERTER_BY_DATA_PATH:
+                converter = CONVERTER_BY_DATA_PATH[data_path]
+                values = converter(values, target)
 
-            for point in dp_keyframes:
-                timekey = (point[0] - anim.frame_start) / defines.FPS
-                if data_path in CONVERTER_BY_DATA_PATH:
-                    converter = CONVERTER_BY_DATA_PATH[data_path]
-                    values = converter(point[1:], target)
-                else:
-                    values = point[1:]
-                self.keyframes[label].append([timekey] + values)
+            self.keyframes[label] = KeyframeList(times, values)
 
     @classmethod
-    def get_keyframes_in_range(cls, action, start, end):
+    def get_keyframes_in_range(cls, action, start, end, keyframe_index=None):
+        if keyframe_index:
+            fcurves = keyframe_index.get_fcurves(action)
+        else:
+            fcurves = KeyframeIndex.read_fcurves(action)
+
         keyframes = dict()
-        for fcurve in action.fcurves:
-            data_path = fcurve.data_path
-            array_index = fcurve.array_index
-            keyframe_points = fcurve.keyframe_points
-            for kp in keyframe_points:
-                frame = round(kp.co[0])
-                if frame < start or frame > end:
-                    continue
-                if data_path not in keyframes:
-                    keyframes[data_path] = []
-                dim = len(keyframes[data_path])
-                while dim <= array_index:
-                    keyframes[data_path].append([])
-                    dim += 1
-                keyframes[data_path][array_index].append((frame, kp.co[1]))
+        for data_path, array_index, frames, values in fcurves:
+            # Frames are sorted, so keyframes in range are found by binary search
+            first = np.searchsorted(frames, start, side="left")
+            last = np.searchsorted(frames, end, side="right")
+            if first == last:
+                continue
+            if data_path not in keyframes:
+                keyframes[data_path] = []
+            dim = len(keyframes[data_path])
+            while dim <= array_index:
+                keyframes[data_path].append([])
+                dim += 1
+            keyframes[data_path][array_index].extend(zip(frames[first:last].tolist(), values[first:last].tolist()))
 
         return keyframes
 
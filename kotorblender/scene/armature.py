@@ -18,13 +18,15 @@
 
 import bpy
 
-from mathutils import Matrix, Quaternion, Vector
+import numpy as np
+
+from mathutils import Vector
 
 from ..defines import DummyType, MeshType
 
 from .. import defines, utils
 
-from .animnode import AnimationNode
+from .animnode import AnimationNode, KeyframeIndex
 
 
 def rebuild_armature(mdl_root):
@@ -60,8 +62,7 @@ def rebuild_armature(mdl_root):
 
     # Copy object keyframes to armature
     bpy.ops.object.mode_set(mode='POSE')
-    for anim in mdl_root.kb.anim_list:
-        copy_object_keyframes_to_armature(anim, mdl_root, armature_obj)
+    copy_object_keyframes_to_armature(mdl_root, armature_obj)
     bpy.ops.object.mode_set(mode='OBJECT')
 
     # Add Armature modifier to all skinmeshes
@@ -92,94 +93,182 @@ def create_armature_bones(armature, obj, parent_bone=None):
         create_armature_bones(armature, child, bone)
 
 
-def copy_object_keyframes_to_armature(anim, obj, armature_obj):
-    if obj.name in armature_obj.pose.bones and obj.animation_data and obj.animation_data.action:
+def copy_object_keyframes_to_armature(mdl_root, armature_obj):
+    anim_list = list(mdl_root.kb.anim_list)
+    if not anim_list:
+        return
+
+    armature_obj.animation_data_create()
+    action = bpy.data.actions.new(name=armature_obj.name + "Action")
+    armature_obj.animation_data.action = action
+
+    # Object keyframes are read once and shared by all animations
+    keyframe_index = KeyframeIndex()
+
+    for obj in utils.find_objects(mdl_root):
+        if obj.name not in armature_obj.pose.bones or not obj.animation_data or not obj.animation_data.action:
+            continue
         bone = armature_obj.pose.bones[obj.name]
-        action = obj.animation_data.action
+        obj_action = obj.animation_data.action
 
         # Calculate rest pose bone matrix, relative to parent
         rel_rest_mat = bone.bone.matrix_local
         if bone.parent:
             rel_rest_mat = bone.parent.bone.matrix_local.inverted() @ rel_rest_mat
-        rel_rest_mat_inv = rel_rest_mat.inverted()
+        rel_rest_mat_inv = np.array(rel_rest_mat.inverted())
         rest_position, rest_orientation, _ = rel_rest_mat.decompose()
 
-        # Extract position and orientation keyframes
-        keyframes = AnimationNode.get_keyframes_in_range(action, anim.frame_start, anim.frame_end)
-        flat_keyframes = AnimationNode.flatten_keyframes(keyframes)
-        positions = []
-        orientations = []
-        for data_path, dp_keyframes in flat_keyframes.items():
-            if data_path == "location":
-                positions = [(values[0], Vector(values[1:])) for values in dp_keyframes]
-            if data_path == "rotation_quaternion":
-                orientations = [(values[0], Quaternion(values[1:])) for values in dp_keyframes]
-
-        # Insert rest pose keyframes
-        rest_frame = anim.frame_start - defines.ANIM_REST_POSE_OFFSET
-        bone.matrix_basis = Matrix()
-        bone.keyframe_insert("location", frame=rest_frame)
-        bone.keyframe_insert("rotation_quaternion", frame=rest_frame)
-
-        frames = set()
-        for frame, _ in positions:
-            frames.add(frame)
-        for frame, _ in orientations:
-            frames.add(frame)
-
-        # Insert bone keyframes for each frame
-        for frame in frames:
-            position = sample_position(positions, frame, rest_position)
-            orientation = sample_orientation(orientations, frame, rest_orientation)
-            rel_pose_mat = Matrix.Translation(position) @ orientation.to_matrix().to_4x4()
+        all_frames = []
+        all_positions = []
+        all_orientations = []
+
+        for anim in anim_list:
+            # Extract position and orientation keyframes
+            keyframes = AnimationNode.get_keyframes_in_range(obj_action, anim.frame_start, anim.frame_end, keyframe_index)
+            flat_keyframes = AnimationNode.flatten_keyframes(keyframes)
+            positions = np.array(flat_keyframes.get("location", []), dtype=np.float64).reshape((-1, 4))
+            orientations = np.array(flat_keyframes.get("rotation_quaternion", []), dtype=np.float64).reshape((-1, 5))
+
+            # Rest pose keyframes
+            rest_frame = anim.frame_start - defines.ANIM_REST_POSE_OFFSET
+            all_frames.append([rest_frame])
+            all_positions.append(np.zeros((1, 3)))
+            all_orientations.append(np.array([[1.0, 0.0, 0.0, 0.0]]))
+
+            # Bone keyframes for each frame of either controller
+            frames = np.union1d(positions[:, 0], orientations[:, 0])
+            if not len(frames):
+                continue
+            all_frames.append(frames)
             if bone.parent:
-                bone.matrix_basis = rel_rest_mat_inv @ rel_pose_mat
-            bone.keyframe_insert("location", frame=frame)
-            bone.keyframe_insert("rotation_quaternion", frame=frame)
-
-    for child in obj.children:
-        copy_object_keyframes_to_armature(anim, child, armature_obj)
-
-
-def sample_position(positions, frame_at, rest_position):
-    left, right = None, None
-
-    for frame, position in positions:
-        if frame == frame_at:
-            return position
-        elif frame < frame_at:
-            left = (frame, position)
-        elif frame > frame_at:
-            right = (frame, position)
-            break
-
-    if not left and not right:
-        return rest_position
-    if left and not right:
-        return left[1]
-    if right and not left:
-        return right[1]
-
-    return left[1].lerp(right[1], (frame_at - left[0]) / (right[0] - left[0]))
-
-
-def sample_orientation(orientations, frame_at, rest_orientation):
-    left, right = None, None
-
-    for frame, orientation in orientations:
-        if frame == frame_at:
-            return orientation
-        elif frame < frame_at:
-            left = (frame, orientation)
-        elif frame > frame_at:
-            right = (frame, orientation)
-            break
-
-    if not left and not right:
-        return rest_orientation
-    if left and not right:
-        return left[1]
-    if right and not left:
-        return right[1]
-
-    return left[1].slerp(right[1], (frame_at - left[0]) / (right[0] - left[0]))
+                sampled_positions = sample_positions(positions, frames, rest_position)
+                sampled_orientations = sample_orientations(orientations, frames, rest_orientation)
+                position, orientation = pose_to_basis(rel_rest_mat_inv, sampled_positions, sampled_orientations)
+                all_positions.append(position)
+                all_orientations.append(orientation)
+            else:
+                # Bones without parent are keyed in their rest pose
+                all_positions.append(np.zeros((len(frames), 3)))
+                all_orientations.append(np.tile([1.0, 0.0, 0.0, 0.0], (len(frames), 1)))
+
+        frames = np.concatenate(all_frames)
+        positions = np.concatenate(all_positions)
+        orientations = np.concatenate(all_orientations)
+
+        for data_path, values in [("location", positions), ("rotation_quaternion", orientations)]:
+            bone_data_path = bone.path_from_id(data_path)
+            for i in range(values.shape[1]):
+                fcurve = action.fcurves.find(bone_data_path, index=i)
+                if not fcurve:
+                    fcurve = action.fcurves.new(bone_data_path, index=i, action_group=bone.name)
+                AnimationNode.add_keyframe_points(fcurve, frames, values[:, i])
+
+
+def get_sample_weights(key_frames, frames):
+    # Keyframes are sorted by frame, so neighbours are found by binary search
+    num_keys = len(key_frames)
+    right = np.searchsorted(key_frames, frames, side="left")
+    exact = (right < num_keys) & (key_frames[np.minimum(right, num_keys - 1)] == frames)
+    left = np.clip(np.where(exact, right, right - 1), 0, num_keys - 1)
+    right = np.minimum(right, num_keys - 1)
+    span = key_frames[right] - key_frames[left]
+    factor = np.where(span > 0.0, (frames - key_frames[left]) / np.where(span > 0.0, span, 1.0), 0.0)
+    return left, right, factor
+
+
+def sample_positions(keyframes, frames, rest_position):
+    if not len(keyframes):
+        return np.tile(rest_position, (len(frames), 1))
+
+    left, right, factor = get_sample_weights(keyframes[:, 0], frames)
+    values = keyframes[:, 1:]
+    factor = factor[:, np.newaxis]
+
+    return (1.0 - factor) * values[left] + factor * values[right]
+
+
+def sample_orientations(keyframes, frames, rest_orientation):
+    if not len(keyframes):
+        return np.tile(rest_orientation, (len(frames), 1))
+
+    left, right, factor = get_sample_weights(keyframes[:, 0], frames)
+    values = keyframes[:, 1:]
+    q1 = values[left]
+    q2 = values[right]
+
+    # Spherical interpolation along the shortest arc, as in Quaternion.slerp
+    cosom = np.sum(q1 * q2, axis=1)
+    q1 = np.where((cosom < 0.0)[:, np.newaxis], -q1, q1)
+    cosom = np.abs(cosom)
+    omega = np.arccos(np.minimum(cosom, 1.0))
+    sinom = np.sin(omega)
+    use_slerp = (1.0 - cosom) > 0.0001
+    safe_sinom = np.where(use_slerp, sinom, 1.0)
+    scale1 = np.where(use_slerp, np.sin((1.0 - factor) * omega) / safe_sinom, 1.0 - factor)
+    scale2 = np.where(use_slerp, np.sin(factor * omega) / safe_sinom, factor)
+    orientations = scale1[:, np.newaxis] * q1 + scale2[:, np.newaxis] * q2
+
+    # Keyframes that are hit exactly are returned as is
+    return np.where((factor == 0.0)[:, np.newaxis], values[left], orientations)
+
+
+def pose_to_basis(rel_rest_mat_inv, positions, orientations):
+    # Bone matrix_basis is inverse relative rest matrix times relative pose matrix
+    rot = rel_rest_mat_inv[:3, :3] @ quaternions_to_matrices(orientations)
+    loc = positions @ rel_rest_mat_inv[:3, :3].T + rel_rest_mat_inv[:3, 3]
+    rot = rot / np.linalg.norm(rot, axis=1)[:, np.newaxis, :]
+    return loc, matrices_to_quaternions(rot)
+
+
+def quaternions_to_matrices(quats):
+    w, x, y, z = quats.T
+    return np.stack((
+        np.stack((1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)), axis=1),
+        np.stack((2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)), axis=1),
+        np.stack((2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)), axis=1)
+    ), axis=1)
+
+
+def matrices_to_quaternions(mats):
+    m = mats
+    quats = np.empty((len(m), 4))
+
+    # Use the formula with the best precision for each matrix, as in Matrix.to_quaternion
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    cases = np.select([trace > 0.0,
+                       (m[:, 0, 0] > m[:, 1, 1]) & (m[:, 0, 0] > m[:, 2, 2]),
+                       m[:, 1, 1] > m[:, 2, 2]],
+                      [0, 1, 2], 3)
+
+    idx = cases == 0
+    s = 2.0 * np.sqrt(1.0 + trace[idx])
+    quats[idx] = np.stack((0.25 * s,
+                           (m[idx, 2, 1] - m[idx, 1, 2]) / s,
+                           (m[idx, 0, 2] - m[idx, 2, 0]) / s,
+                           (m[idx, 1, 0] - m[idx, 0, 1]) / s), axis=1)
+
+    idx = cases == 1
+    s = 2.0 * np.sqrt(1.0 + m[idx, 0, 0] - m[idx, 1, 1] - m[idx, 2, 2])
+    quats[idx] = np.stack(((m[idx, 2, 1] - m[idx, 1, 2]) / s,
+                           0.25 * s,
+                           (m[idx, 0, 1] + m[idx, 1, 0]) / s,
+                           (m[idx, 0, 2] + m[idx, 2, 0]) / s), axis=1)
+
+    idx = cases == 2
+    s = 2.0 * np.sqrt(1.0 + m[idx, 1, 1] - m[idx, 0, 0] - m[idx, 2, 2])
+    quats[idx] = np.stack(((m[idx, 0, 2] - m[idx, 2, 0]) / s,
+                           (m[idx, 0, 1] + m[idx, 1, 0]) / s,
+                           0.25 * s,
+                           (m[idx, 1, 2] + m[idx, 2, 1]) / s), axis=1)
+
+    idx = cases == 3
+    s = 2.0 * np.sqrt(1.0 + m[idx, 2, 2] - m[idx, 0, 0] - m[idx, 1, 1])
+    quats[idx] = np.stack(((m[idx, 1, 0] - m[idx, 0, 1]) / s,
+                           (m[idx, 0, 2] + m[idx, 2, 0]) / s,
+                           (m[idx, 1, 2] + m[idx, 2, 1]) / s,
+                           0.25 * s), axis=1)
+
+    # Make sure w is non-negative for a canonical result
+    quats[quats[:, 0] < 0.0] *= -1.0
+
+    return quats / np.linalg.norm(quats, axis=1)[:, np.newaxis]
@@ -27,6 +27,7 @@ from ..defines import DummyType, MeshType, NodeType
 from .. import defines, utils
 
 from .animation import Animation
+from .animnode import KeyframeIndex, KeyframeWriter
 from .modelnode.aabb import AabbNode
 from .modelnode.danglymesh import DanglymeshNode
 from .modelnode.dummy import DummyNode
@@ -41,6 +42,8 @@ from . import armature
 
 
 class Model:
+    __slots__ = ("name", "supermodel", "classification", "subclassification", "affected_by_fog", "animroot",
+                 "animscale", "root_node", "animations")
 
     def __init__(self):
         self.name = "UNNAMED"
@@ -98,8 +101,11 @@ class Model:
             self.import_nodes_to_collection(child, obj, collection, options)
 
     def create_animations(self, mdl_root, animscale):
+        objects_by_node_number = utils.find_objects_by_node_number(mdl_root)
+        keyframe_writer = KeyframeWriter()
         for anim in self.animations:
-            anim.add_to_objects(mdl_root, animscale)
+            anim.add_to_objects(mdl_root, animscale, objects_by_node_number, keyframe_writer)
+        keyframe_writer.write()
 
     def find_node(self, test):
         return self.root_node.find_node(test)
@@ -118,7 +124,9 @@ class Model:
         model.root_node = cls.model_node_from_object(root_obj, options)
 
         if options.export_animations:
-            model.animations = [Animation.from_list_anim(anim, root_obj) for anim in root_obj.kb.anim_list]
+            # Keyframes of each action are read once and shared by all animations
+            keyframe_index = KeyframeIndex()
+            model.animations = [Animation.from_list_anim(anim, root_obj, keyframe_index) for anim in root_obj.kb.anim_list]
 
         return model
 
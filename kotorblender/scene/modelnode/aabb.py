@@ -18,19 +18,25 @@
 
 import bpy
 
-from bpy_extras.io_utils import unpack_list
+import numpy as np
+
 from mathutils import Vector
 
 from ...defines import MeshType, NodeType, NormalsAlgorithm, RootType, WalkmeshMaterial
 
 from ... import defines
 
-from .trimesh import TrimeshNode, UV_MAP_DIFFUSE, UV_MAP_LIGHTMAP
+from .trimesh import ArrayAttribute, TrimeshNode, UV_MAP_DIFFUSE, UV_MAP_LIGHTMAP
 
 ROOM_LINKS_COLORS = "RoomLinks"
 
 
 class AabbNode(TrimeshNode):
+    __slots__ = ("lytposition", "roomlinks", "aabb_tree")
+
+    # Walkmesh vertices are relative to the walkmesh position, and are kept in
+    # double precision so that adding the position back restores them exactly
+    verts = ArrayAttribute(np.float64, 3)
 
     def __init__(self, name="UNNAMED"):
         TrimeshNode.__init__(self, name)
@@ -39,6 +45,7 @@ class AabbNode(TrimeshNode):
 
         self.lytposition = (0.0, 0.0, 0.0)
         self.roomlinks = dict()
+        self.aabb_tree = None
 
     def compute_lyt_position(self, wok_geom):
         wok_position = Vector(wok_geom.position)
@@ -68,10 +75,10 @@ class AabbNode(TrimeshNode):
         # Create the mesh itself
         mesh = bpy.data.meshes.new(name)
         mesh.vertices.add(len(self.verts))
-        mesh.vertices.foreach_set("co", unpack_list(self.verts))
+        mesh.vertices.foreach_set("co", self.verts.ravel())
         num_faces = len(self.facelist.vertices)
         mesh.loops.add(3 * num_faces)
-        mesh.loops.foreach_set("vertex_index", unpack_list(self.facelist.vertices))
+        mesh.loops.foreach_set("vertex_index", self.facelist.vertices.astype(np.int32).ravel())
         mesh.polygons.add(num_faces)
         mesh.polygons.foreach_set("loop_start", range(0, 3 * num_faces, 3))
         mesh.polygons.foreach_set("loop_total", (3,) * num_faces)
@@ -90,18 +97,17 @@ class AabbNode(TrimeshNode):
             mesh.materials.append(material)
 
         # Apply the walkmesh materials to each face
-        for idx, polygon in enumerate(mesh.polygons):
-            polygon.material_index = self.facelist.materials[idx]
+        mesh.polygons.foreach_set("material_index", self.facelist.materials.astype(np.int32))
 
         # Create UV map
         if len(self.uv1) > 0:
-            uv = unpack_list([self.uv1[i] for indices in self.facelist.uv for i in indices])
+            uv = self.uv1[self.facelist.uv].ravel()
             uv_layer = mesh.uv_layers.new(name=UV_MAP_DIFFUSE, do_init=False)
             uv_layer.data.foreach_set("uv", uv)
 
         # Create lightmap UV map
         if len(self.uv2) > 0:
-            uv = unpack_list([self.uv2[i] for indices in self.facelist.uv for i in indices])
+            uv = self.uv2[self.facelist.uv].ravel()
             uv_layer = mesh.uv_layers.new(name=UV_MAP_LIGHTMAP, do_init=False)
             uv_layer.data.foreach_set("uv", uv)
 
@@ -24,6 +24,7 @@ CONSTRAINTS = "constraints"
 
 
 class DanglymeshNode(TrimeshNode):
+    __slots__ = ("period", "tightness", "displacement", "constraints")
 
     def __init__(self, name="UNNAMED"):
         TrimeshNode.__init__(self, name)
@@ -52,10 +53,18 @@ class DanglymeshNode(TrimeshNode):
         self.constraints = self.constraints[:num_unique]
 
     def add_constraints_to_object(self, obj):
-        group = obj.vertex_groups.new(name=CONSTRAINTS)
+        # Vertices with the same constraint are added to the group at once
+        vert_indices = dict()
         for vert_idx, constraint in enumerate(self.constraints):
+            if constraint in vert_indices:
+                vert_indices[constraint].append(vert_idx)
+            else:
+                vert_indices[constraint] = [vert_idx]
+
+        group = obj.vertex_groups.new(name=CONSTRAINTS)
+        for constraint, indices in vert_indices.items():
             weight = constraint / 255
-            group.add([vert_idx], weight, 'REPLACE')
+            group.add(indices, weight, 'REPLACE')
         obj.kb.constraints = group.name
 
     def load_object_data(self, obj, options):
@@ -67,5 +76,10 @@ class DanglymeshNode(TrimeshNode):
 
         if CONSTRAINTS not in self.eval_obj.vertex_groups:
             return
-        group = self.eval_obj.vertex_groups[CONSTRAINTS]
-        self.constraints = [255.0 * group.weight(i) for i in range(len(self.verts))]
+        # Blender has no bulk accessor for vertex group weights, so they are
+        # read per vertex, in a single pass as for skin weights
+        group_idx = self.eval_obj.vertex_groups[CONSTRAINTS].index
+        self.constraints = []
+        for vert in self.eval_mesh.vertices:
+            weight = next((group_weight.weight for group_weight in vert.groups if group_weight.group == group_idx), 0.0)
+            self.constraints.append(255.0 * weight)
@@ -22,6 +22,7 @@ from .geometry import GeometryNode
 
 
 class DummyNode(GeometryNode):
+    __slots__ = ("dummytype",)
 
     def __init__(self, name="UNNAMED"):
         GeometryNode.__init__(self, name)
@@ -108,6 +108,8 @@ class EmitterNode(GeometryNode):
         "colormid",
         "colorend"]
 
+    __slots__ = ["meshtype"] + EMITTER_ATTRS
+
     def __init__(self, name="UNNAMED"):
         GeometryNode.__init__(self, name)
         self.nodetype = NodeType.EMITTER
@@ -24,6 +24,8 @@ from ...defines import RootType
 
 
 class GeometryNode:
+    __slots__ = ("nodetype", "roottype", "node_number", "export_order", "name", "position", "orientation", "scale",
+                 "parent", "children", "from_root")
 
     def __init__(self, name="UNNAMED"):
         self.nodetype = "undefined"
@@ -24,6 +24,8 @@ from .geometry import GeometryNode
 
 
 class FlareList:
+    __slots__ = ("textures", "sizes", "positions", "colorshifts")
+
     def __init__(self):
         self.textures = []
         self.sizes = []
@@ -32,6 +34,8 @@ class FlareList:
 
 
 class LightNode(GeometryNode):
+    __slots__ = ("shadow", "radius", "multiplier", "lightpriority", "color", "ambientonly", "dynamictype",
+                 "affectdynamic", "fadinglight", "lensflares", "flareradius", "flare_list")
 
     def __init__(self, name="UNNAMED"):
         GeometryNode.__init__(self, name)
@@ -22,6 +22,7 @@ from .trimesh import TrimeshNode
 
 
 class LightsaberNode(TrimeshNode):
+    __slots__ = ()
 
     def __init__(self, name="UNNAMED"):
         TrimeshNode.__init__(self, name)
@@ -24,6 +24,7 @@ from .geometry import GeometryNode
 
 
 class ReferenceNode(GeometryNode):
+    __slots__ = ("dummytype", "refmodel", "reattachable")
 
     def __init__(self, name="UNNAMED"):
         GeometryNode.__init__(self, name)
@@ -22,6 +22,7 @@ from .trimesh import TrimeshNode
 
 
 class SkinmeshNode(TrimeshNode):
+    __slots__ = ("weights",)
 
     def __init__(self, name="UNNAMED"):
         TrimeshNode.__init__(self, name)
@@ -44,22 +45,26 @@ class SkinmeshNode(TrimeshNode):
         self.weights = self.weights[:num_unique]
 
     def add_skin_groups_to_object(self, obj):
-        groups = dict()
+        # Vertices with the same bone and weight are added to a group at once.
+        # If a vertex lists a bone more than once, the last weight wins.
+        vert_indices = dict()
         for vert_idx, vert_weights in enumerate(self.weights):
-            for bone_name, weight in vert_weights:
-                if bone_name in groups:
-                    groups[bone_name].add([vert_idx], weight, 'REPLACE')
+            for bone_name, weight in dict(vert_weights).items():
+                key = (bone_name, weight)
+                if key in vert_indices:
+                    vert_indices[key].append(vert_idx)
                 else:
-                    group = obj.vertex_groups.new(name=bone_name)
-                    group.add([vert_idx], weight, 'REPLACE')
-                    groups[bone_name] = group
+                    vert_indices[key] = [vert_idx]
+
+        groups = dict()
+        for (bone_name, weight), indices in vert_indices.items():
+            if bone_name not in groups:
+                groups[bone_name] = obj.vertex_groups.new(name=bone_name)
+            groups[bone_name].add(indices, weight, 'REPLACE')
 
     def load_object_data(self, obj, options):
         TrimeshNode.load_object_data(self, obj, options)
 
+        group_names = [group.name for group in obj.vertex_groups]
         for vert in self.eval_mesh.vertices:
-            vert_weights = []
-            for group_weight in vert.groups:
-                group = obj.vertex_groups[group_weight.group]
-                vert_weights.append((group.name, group_weight.weight))
-            self.weights.append(vert_weights)
+            self.weights.append([(group_names[group_weight.group], group_weight.weight) for group_weight in vert.groups])
@@ -20,7 +20,8 @@ from math import cos, sqrt
 
 import bpy
 
-from bpy_extras.io_utils import unpack_list
+import numpy as np
+
 from mathutils import Vector
 
 from ...defines import NodeType, NormalsAlgorithm, RootType
@@ -38,15 +39,63 @@ UV_MAP_DIFFUSE = "UVMap"
 UV_MAP_LIGHTMAP = "UVMap_lm"
 
 
+class ArrayAttribute:
+    # Attribute holding one row per vertex or face as a NumPy array. Lists and
+    # arrays of another type or layout are converted to a contiguous array of
+    # the declared type. Writable contiguous arrays of the declared type are
+    # not copied, so the attribute aliases the assigned array.
+
+    def __init__(self, dtype, num_columns=None):
+        self.dtype = dtype
+        self.shape = (-1, num_columns) if num_columns else (-1,)
+
+    def __set_name__(self, owner, name):
+        self.private_name = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj, self.private_name)
+
+    def __set__(self, obj, value):
+        array = np.ascontiguousarray(value, dtype=self.dtype).reshape(self.shape)
+        if not array.flags.writeable:
+            array = array.copy()
+        setattr(obj, self.private_name, array)
+
+
 class FaceList:
+    __slots__ = ("_vertices", "_materials", "_normals")
+
+    vertices = ArrayAttribute(np.uint32, 3)  # vertex indices
+    materials = ArrayAttribute(np.uint32)
+    normals = ArrayAttribute(np.float32, 3)
+
     def __init__(self):
-        self.vertices = []  # vertex indices
-        self.uv = []  # UV indices
+        self.vertices = []
         self.materials = []
         self.normals = []
 
+    @property
+    def uv(self):
+        # UV indices always match vertex indices
+        return self.vertices
+
 
 class TrimeshNode(GeometryNode):
+    __slots__ = ("meshtype", "center", "lightmapped", "render", "shadow", "beaming", "background_geometry",
+                 "dirt_enabled", "dirt_texture", "dirt_worldspace", "hologram_donotdraw", "animateuv", "uvdirectionx",
+                 "uvdirectiony", "uvjitter", "uvjitterspeed", "alpha", "transparencyhint", "selfillumcolor", "ambient",
+                 "diffuse", "bitmap", "bitmap2", "tangentspace", "rotatetexture", "_verts", "_normals", "_uv1", "_uv2",
+                 "_tangents", "_bitangents", "_tangentspacenormals", "facelist", "sharp_edges", "eval_obj", "eval_mesh")
+
+    verts = ArrayAttribute(np.float32, 3)
+    normals = ArrayAttribute(np.float32, 3)
+    uv1 = ArrayAttribute(np.float32, 2)
+    uv2 = ArrayAttribute(np.float32, 2)
+    tangents = ArrayAttribute(np.float32, 3)
+    bitangents = ArrayAttribute(np.float32, 3)
+    tangentspacenormals = ArrayAttribute(np.float32, 3)
 
     def __init__(self, name="UNNAMED"):
         GeometryNode.__init__(self, name)
@@ -114,10 +163,10 @@ class TrimeshNode(GeometryNode):
         # Create the mesh itself
         mesh = bpy.data.meshes.new(name)
         mesh.vertices.add(len(self.verts))
-        mesh.vertices.foreach_set("co", unpack_list(self.verts))
+        mesh.vertices.foreach_set("co", self.verts.ravel())
         num_faces = len(self.facelist.vertices)
         mesh.loops.add(3 * num_faces)
-        mesh.loops.foreach_set("vertex_index", unpack_list(self.facelist.vertices))
+        mesh.loops.foreach_set("vertex_index", self.facelist.vertices.astype(np.int32).ravel())
         mesh.polygons.add(num_faces)
         mesh.polygons.foreach_set("loop_start", range(0, 3 * num_faces, 3))
         mesh.polygons.foreach_set("loop_total", (3,) * num_faces)
@@ -125,13 +174,13 @@ class TrimeshNode(GeometryNode):
 
         # Create UV map
         if len(self.uv1) > 0:
-            uv = unpack_list([self.uv1[i] for indices in self.facelist.uv for i in indices])
+            uv = self.uv1[self.facelist.uv].ravel()
             uv_layer = mesh.uv_layers.new(name=UV_MAP_DIFFUSE, do_init=False)
             uv_layer.data.foreach_set("uv", uv)
 
         # Create lightmap UV map
         if len(self.uv2) > 0:
-            uv = unpack_list([self.uv2[i] for indices in self.facelist.uv for i in indices])
+            uv = self.uv2[self.facelist.uv].ravel()
             uv_layer = mesh.uv_layers.new(name=UV_MAP_LIGHTMAP, do_init=False)
             uv_layer.data.foreach_set("uv", uv)
 
@@ -156,32 +205,37 @@ class TrimeshNode(GeometryNode):
 
         # Sort vertices into unique and duplicate
 
+        verts = self.verts.tolist()
+        vert_normals = self.normals.tolist()
+        vert_uv1 = self.uv1.tolist()
+        vert_uv2 = self.uv2.tolist()
+        grid = utils.build_close_grid(verts, MERGE_DISTANCE)
         new_idx_by_old_idx = dict()
         unique_indices = []
         split_normals = []
-        for vert_idx, vert in enumerate(self.verts):
+        for vert_idx, vert in enumerate(verts):
             if vert_idx in new_idx_by_old_idx:
                 continue
             num_unique = len(unique_indices)
-            normal = self.normals[vert_idx]
+            normal = vert_normals[vert_idx]
             normals = [normal]
-            if self.uv1:
-                uv1 = self.uv1[vert_idx]
-            if self.uv2:
-                uv2 = self.uv2[vert_idx]
-            for other_vert_idx in range(vert_idx+1, len(self.verts)):
-                if other_vert_idx in new_idx_by_old_idx:
+            if vert_uv1:
+                uv1 = vert_uv1[vert_idx]
+            if vert_uv2:
+                uv2 = vert_uv2[vert_idx]
+            for other_vert_idx in utils.find_close_candidates(grid, vert, MERGE_DISTANCE):
+                if other_vert_idx <= vert_idx or other_vert_idx in new_idx_by_old_idx:
                     continue
-                other_vert = self.verts[other_vert_idx]
-                other_normal = self.normals[other_vert_idx]
-                if self.uv1:
-                    other_uv1 = self.uv1[other_vert_idx]
-                if self.uv2:
-                    other_uv2 = self.uv2[other_vert_idx]
+                other_vert = verts[other_vert_idx]
+                other_normal = vert_normals[other_vert_idx]
+                if vert_uv1:
+                    other_uv1 = vert_uv1[other_vert_idx]
+                if vert_uv2:
+                    other_uv2 = vert_uv2[other_vert_idx]
                 # Vertices are similar if their coords and UV are very close, and angle between their normals is acute
                 if (utils.is_close_3(vert, other_vert, MERGE_DISTANCE) and
-                        ((not self.uv1) or utils.is_close_2(uv1, other_uv1, MERGE_DISTANCE_UV)) and
-                        ((not self.uv2) or utils.is_close_2(uv2, other_uv2, MERGE_DISTANCE_UV)) and
+                        ((not vert_uv1) or utils.is_close_2(uv1, other_uv1, MERGE_DISTANCE_UV)) and
+                        ((not vert_uv2) or utils.is_close_2(uv2, other_uv2, MERGE_DISTANCE_UV)) and
                         cos_angle_between(normal, other_normal) > 0.5):
                     new_idx_by_old_idx[other_vert_idx] = num_unique
                     normals.append(other_normal)
@@ -210,11 +264,10 @@ class TrimeshNode(GeometryNode):
 
         # Fix face vertex indices, determine sharp edges
 
-        for face_idx, old_face in enumerate(self.facelist.vertices):
-            new_face = [new_idx_by_old_idx[old_face[i]] for i in range(3)]
-            self.facelist.vertices[face_idx] = new_face
-            self.facelist.uv[face_idx] = new_face
+        new_indices = np.array([new_idx_by_old_idx[vert_idx] for vert_idx in range(len(verts))], dtype=np.uint32)
+        self.facelist.vertices = new_indices[self.facelist.vertices]
 
+        for new_face in self.facelist.vertices.tolist():
             # Edge is sharp if both of its vertices are sharp
 
             edges = [tuple(sorted(pair)) for pair in [(new_face[0], new_face[1]), (new_face[1], new_face[2]), (new_face[2], new_face[0])]]
@@ -223,27 +276,21 @@ class TrimeshNode(GeometryNode):
                     self.sharp_edges.add(edge)
 
     def compact_vertices(self, unique_indices, split_normals):
-        for new_idx, old_idx in enumerate(unique_indices):
+        normals = []
+        for new_idx in range(len(unique_indices)):
             normal = Vector()
             for n in split_normals[new_idx]:
                 for i in range(3):
                     normal[i] += n[i]
             normal.normalize()
+            normals.append(normal)
 
-            self.verts[new_idx] = self.verts[old_idx]
-            self.normals[new_idx] = tuple(normal[:3])
-            if self.uv1:
-                self.uv1[new_idx] = self.uv1[old_idx]
-            if self.uv2:
-                self.uv2[new_idx] = self.uv2[old_idx]
-
-        num_unique = len(unique_indices)
-        self.verts = self.verts[:num_unique]
-        self.normals = self.normals[:num_unique]
-        if self.uv1:
-            self.uv1 = self.uv1[:num_unique]
-        if self.uv2:
-            self.uv2 = self.uv2[:num_unique]
+        self.verts = self.verts[unique_indices]
+        self.normals = normals
+        if len(self.uv1) > 0:
+            self.uv1 = self.uv1[unique_indices]
+        if len(self.uv2) > 0:
+            self.uv2 = self.uv2[unique_indices]
 
     def post_process_mesh(self, mesh, options):
         if options.normals_algorithm == NormalsAlgorithm.SHARP_EDGES:
@@ -253,7 +300,7 @@ class TrimeshNode(GeometryNode):
                     edge.use_edge_sharp = True
         elif options.normals_algorithm == NormalsAlgorithm.CUSTOM:
             # Set custom normals
-            mesh.normals_split_custom_set_from_vertices(self.normals)
+            mesh.normals_split_custom_set_from_vertices(self.normals.tolist())
             mesh.use_auto_smooth = True
 
     def set_object_data(self, obj, options):
@@ -321,8 +368,10 @@ class TrimeshNode(GeometryNode):
         self.eval_mesh = self.eval_obj.data
         self.eval_mesh.calc_loop_triangles()
 
-        for vert in self.eval_mesh.vertices:
-            self.verts.append(vert.co[:3])
+        num_verts = len(self.eval_mesh.vertices)
+        verts = np.empty(3 * num_verts, dtype=np.float32)
+        self.eval_mesh.vertices.foreach_get("co", verts)
+        self.verts = verts
 
         if options.export_custom_normals and self.eval_mesh.has_custom_normals:
             self.eval_mesh.calc_normals_split()
@@ -333,48 +382,46 @@ class TrimeshNode(GeometryNode):
                         normals[vert_idx] = Vector(normal)
                     else:
                         normals[vert_idx] += Vector(normal)
-            for vert_idx in range(len(self.eval_mesh.vertices)):
-                normal = normals[vert_idx].normalized()
-                self.normals.append(normal)
+            self.normals = [normals[vert_idx].normalized() for vert_idx in range(num_verts)]
         else:
-            for vert in self.eval_mesh.vertices:
-                self.normals.append(vert.normal[:3])
+            normals = np.empty(3 * num_verts, dtype=np.float32)
+            self.eval_mesh.vertices.foreach_get("normal", normals)
+            self.normals = normals
 
         self.uv1 = self.get_uv_from_uv_layer(self.eval_mesh, UV_MAP_DIFFUSE)
         self.uv2 = self.get_uv_from_uv_layer(self.eval_mesh, UV_MAP_LIGHTMAP)
 
-        if self.tangentspace:
-            num_verts = len(self.eval_mesh.vertices)
-            self.tangents = [Vector() for _ in range(num_verts)]
-            self.bitangents = [Vector() for _ in range(num_verts)]
-            self.tangentspacenormals = [Vector() for _ in range(num_verts)]
-            if self.uv1:
-                self.eval_mesh.calc_tangents(uvmap=UV_MAP_DIFFUSE)
-
-        for tri in self.eval_mesh.loop_triangles:
-            self.facelist.vertices.append(tri.vertices[:3])
-            self.facelist.uv.append(tri.vertices[:3])
-            self.facelist.materials.append(tri.material_index)
-            self.facelist.normals.append(tri.normal)
-
-            if self.tangentspace and self.uv1:
-                for loop in [self.eval_mesh.loops[i] for i in tri.loops]:
-                    vert_idx = loop.vertex_index
-                    self.tangents[vert_idx] += loop.tangent
-                    self.bitangents[vert_idx] += loop.bitangent
-                    self.tangentspacenormals[vert_idx] += loop.normal
+        loop_triangles = self.eval_mesh.loop_triangles
+        num_faces = len(loop_triangles)
+        face_verts = np.empty(3 * num_faces, dtype=np.int32)
+        loop_triangles.foreach_get("vertices", face_verts)
+        materials = np.empty(num_faces, dtype=np.int32)
+        loop_triangles.foreach_get("material_index", materials)
+        face_normals = np.empty(3 * num_faces, dtype=np.float32)
+        loop_triangles.foreach_get("normal", face_normals)
+        self.facelist.vertices = face_verts
+        self.facelist.materials = materials
+        self.facelist.normals = face_normals
 
         if self.tangentspace:
-            if self.uv1:
-                for vert_idx in range(num_verts):
-                    self.tangents[vert_idx].normalize()
-                    self.bitangents[vert_idx].normalize()
-                    self.tangentspacenormals[vert_idx].normalize()
+            if len(self.uv1) > 0:
+                self.eval_mesh.calc_tangents(uvmap=UV_MAP_DIFFUSE)
+                tangents = [Vector() for _ in range(num_verts)]
+                bitangents = [Vector() for _ in range(num_verts)]
+                tangentspacenormals = [Vector() for _ in range(num_verts)]
+                for tri in loop_triangles:
+                    for loop in [self.eval_mesh.loops[i] for i in tri.loops]:
+                        vert_idx = loop.vertex_index
+                        tangents[vert_idx] += loop.tangent
+                        bitangents[vert_idx] += loop.bitangent
+                        tangentspacenormals[vert_idx] += loop.normal
+                self.tangents = [vec.normalized() for vec in tangents]
+                self.bitangents = [vec.normalized() for vec in bitangents]
+                self.tangentspacenormals = [vec.normalized() for vec in tangentspacenormals]
             else:
-                for vert_idx in range(num_verts):
-                    self.tangents[vert_idx] = Vector((1.0, 0.0, 0.0))
-                    self.bitangents[vert_idx] = Vector((0.0, 1.0, 0.0))
-                    self.tangentspacenormals[vert_idx] = Vector((0.0, 0.0, 1.0))
+                self.tangents = np.tile((1.0, 0.0, 0.0), (num_verts, 1))
+                self.bitangents = np.tile((0.0, 1.0, 0.0), (num_verts, 1))
+                self.tangentspacenormals = np.tile((0.0, 0.0, 1.0), (num_verts, 1))
 
     def get_uv_from_uv_layer(self, mesh, layer_name):
         if not layer_name in mesh.uv_layers:
@@ -16,6 +16,13 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import multiprocessing
+import sys
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import product
+from math import floor, isfinite, log, log1p
+
 from .defines import *
 
 
@@ -82,6 +89,15 @@ def find_objects(obj, test=lambda _: True):
     return nodes
 
 
+def find_objects_by_node_number(obj):
+    # Like find_object, the first object in depth-first order wins
+    objects = dict()
+    for match in find_objects(obj):
+        if match.kb.node_number not in objects:
+            objects[match.kb.node_number] = match
+    return objects
+
+
 def is_null(s):
     return not s or s.lower() == NULL.lower()
 
@@ -104,6 +120,43 @@ def is_close_3(a, b, rel_tol):
             is_close(a[2], b[2], rel_tol))
 
 
+def get_close_cell(vec, rel_tol):
+    # Relatively close values have the same sign and differ by at most
+    # -log(1 - rel_tol) on a log scale, so cells twice that wide guarantee
+    # that close values are in the same or neighbouring cells
+    width = -2.0 * log1p(-rel_tol)
+    cell = []
+    for val in vec:
+        if val == 0.0:
+            cell.append((0, 0))
+        elif not isfinite(val):
+            cell.append((0, 1))
+        else:
+            cell.append((1 if val > 0.0 else -1, floor(log(abs(val)) / width)))
+    return tuple(cell)
+
+
+def build_close_grid(vecs, rel_tol):
+    grid = dict()
+    for idx, vec in enumerate(vecs):
+        cell = get_close_cell(vec, rel_tol)
+        if cell in grid:
+            grid[cell].append(idx)
+        else:
+            grid[cell] = [idx]
+    return grid
+
+
+def find_close_candidates(grid, vec, rel_tol):
+    cell = get_close_cell(vec, rel_tol)
+    ranges = [[c] if c[0] == 0 else [(c[0], c[1] + offset) for offset in (-1, 0, 1)] for c in cell]
+    candidates = []
+    for neighbour in product(*ranges):
+        if neighbour in grid:
+            candidates.extend(grid[neighbour])
+    return sorted(candidates)
+
+
 def color_to_hex(color):
     return "{}{}{}".format(
         int_to_hex(float_to_byte(color[0])),
@@ -117,3 +170,13 @@ def float_to_byte(val):
 
 def int_to_hex(val):
     return "{:02X}".format(val)
+
+
+def new_worker_pool(max_workers=None):
+    # Forked workers inherit loaded modules, including bpy, which spawned
+    # workers would have to import again outside of Blender. Forking is only
+    # safe on Linux, and only from headless processes such as batch conversion.
+    if sys.platform.startswith("linux"):
+        return ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("fork"))
+    else:
+        return ThreadPoolExecutor(max_workers)
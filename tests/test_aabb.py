@@ -0,0 +1,250 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import random
+import unittest
+
+import numpy as np
+
+from kotorblender.defines import AabbSplit
+
+from kotorblender import aabb, utils
+
+
+def generate_tree_recursive(aabb_tree, face_list):
+    # Recursive centroid split that aabb.generate_tree used to perform. Faces
+    # are tuples of face index, vertices and centroid.
+    bb_min = [100000.0] * 3
+    bb_max = [-100000.0] * 3
+    bb_centroid = [0.0] * 3
+    for _, face_verts, face_centroid in face_list:
+        for vert in face_verts:
+            for axis in range(3):
+                bb_min[axis] = min(bb_min[axis], vert[axis])
+                bb_max[axis] = max(bb_max[axis], vert[axis])
+        bb_centroid = [bb_centroid[axis] + face_centroid[axis] for axis in range(3)]
+    bb_centroid = [val / len(face_list) for val in bb_centroid]
+
+    if len(face_list) == 1:
+        aabb_tree.append([*bb_min, *bb_max, -1, -1, face_list[0][0], 0])
+        return
+
+    bb_size = [bb_max[axis] - bb_min[axis] for axis in range(3)]
+    if bb_size[1] > bb_size[0] and bb_size[1] > bb_size[2]:
+        split_axis = 1
+    elif bb_size[2] > bb_size[0] and bb_size[2] > bb_size[1]:
+        split_axis = 2
+    else:
+        split_axis = 0
+
+    if all(utils.is_close(face[2][split_axis], bb_centroid[split_axis], 1e-4) for face in face_list):
+        split_axis = (split_axis + 1) % 3
+
+    for _ in range(3):
+        face_list_left = [face for face in face_list if face[2][split_axis] < bb_centroid[split_axis]]
+        face_list_right = [face for face in face_list if face[2][split_axis] >= bb_centroid[split_axis]]
+        if face_list_left and face_list_right:
+            break
+        split_axis = (split_axis + 1) % 3
+    else:
+        raise RuntimeError("Generated tree is degenerate")
+
+    node = [*bb_min, *bb_max, 0, 0, -1, 1 + split_axis]
+    aabb_tree.append(node)
+    node[6] = len(aabb_tree)
+    generate_tree_recursive(aabb_tree, face_list_left)
+    node[7] = len(aabb_tree)
+    generate_tree_recursive(aabb_tree, face_list_right)
+
+
+def generate_tree_reference(verts, faces):
+    face_list = []
+    for face_idx, face in enumerate(faces):
+        face_verts = [verts[vert_idx] for vert_idx in face]
+        centroid = [sum(vert[axis] for vert in face_verts) / 3 for axis in range(3)]
+        face_list.append((face_idx, face_verts, centroid))
+    aabb_tree = []
+    generate_tree_recursive(aabb_tree, face_list)
+    return aabb_tree
+
+
+def split_by_surface_area_reference(face_min, face_max, centroids):
+    # Lowest surface area heuristic cost over all sorted splits on all axes
+    num_faces = len(centroids)
+    best_cost = None
+    for axis in range(3):
+        order = sorted(range(num_faces), key=lambda face_idx: centroids[face_idx][axis])
+        for num_left in range(1, num_faces):
+            cost = 0.0
+            for part in (order[:num_left], order[num_left:]):
+                size = [max(face_max[i][k] for i in part) - min(face_min[i][k] for i in part) for k in range(3)]
+                area = size[0] * size[1] + size[1] * size[2] + size[2] * size[0]
+                cost += area * len(part)
+            if best_cost is None or cost < best_cost:
+                best_cost = cost
+    return best_cost
+
+
+def get_split_cost(face_min, face_max, left, right):
+    cost = 0.0
+    for part in (left, right):
+        size = face_max[part].max(axis=0) - face_min[part].min(axis=0)
+        cost += (size[0] * size[1] + size[1] * size[2] + size[2] * size[0]) * len(face_min[part])
+    return cost
+
+
+def new_grid_mesh(size, jitter, rnd):
+    verts = []
+    for row in range(size + 1):
+        for col in range(size + 1):
+            verts.append((col + rnd.uniform(-jitter, jitter), row + rnd.uniform(-jitter, jitter), rnd.uniform(-jitter, jitter)))
+    faces = []
+    for row in range(size):
+        for col in range(size):
+            vert_idx = row * (size + 1) + col
+            faces.append((vert_idx, vert_idx + 1, vert_idx + size + 2))
+            faces.append((vert_idx, vert_idx + size + 2, vert_idx + size + 1))
+    return verts, faces
+
+
+def new_test_meshes():
+    rnd = random.Random(7)
+    meshes = [
+        ([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)], [(0, 1, 2)]),
+        new_grid_mesh(6, 0.0, rnd),
+        new_grid_mesh(5, 0.3, rnd)]
+    # Row of faces, the middle one centred on the split plane
+    verts = [vert for x in range(5) for vert in [(x - 0.5, 0.0, 0.0), (x + 0.5, 0.0, 0.0), (float(x), 1.0, 0.0)]]
+    meshes.append((verts, [(3 * face_idx, 3 * face_idx + 1, 3 * face_idx + 2) for face_idx in range(5)]))
+    verts = [(rnd.uniform(-20.0, 20.0), rnd.uniform(-5.0, 5.0), rnd.uniform(0.0, 10.0)) for _ in range(40)]
+    faces = [tuple(rnd.sample(range(len(verts)), 3)) for _ in range(50)]
+    meshes.append((verts, faces))
+    return meshes
+
+
+def assert_tree_bounds(test, aabb_tree, verts, faces):
+    # Leaves are bounded by their face, other nodes by their children
+    verts = np.asarray(verts, dtype=np.float64)
+    for node in aabb_tree:
+        child_idx1, child_idx2, face_idx = node[6:9]
+        if face_idx != -1:
+            face_verts = verts[list(faces[face_idx])]
+            bb_min = face_verts.min(axis=0)
+            bb_max = face_verts.max(axis=0)
+        else:
+            child1 = aabb_tree[child_idx1]
+            child2 = aabb_tree[child_idx2]
+            bb_min = np.minimum(child1[:3], child2[:3])
+            bb_max = np.maximum(child1[3:6], child2[3:6])
+        test.assertEqual(node[:3], bb_min.tolist())
+        test.assertEqual(node[3:6], bb_max.tolist())
+
+
+class TestAabbTree(unittest.TestCase):
+
+    def test_centroid_split_matches_recursive(self):
+        for verts, faces in new_test_meshes():
+            aabb_tree = aabb.generate_tree(verts, faces, AabbSplit.CENTROID)
+            expected_tree = generate_tree_reference(verts, faces)
+            self.assertEqual(len(aabb_tree), len(expected_tree))
+            for node, expected_node in zip(aabb_tree, expected_tree):
+                self.assertEqual(node[6:], expected_node[6:])
+                for val, expected_val in zip(node[:6], expected_node[:6]):
+                    self.assertAlmostEqual(val, expected_val, places=12)
+
+    def test_coincident_faces_are_split_in_half(self):
+        verts = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]
+        faces = [(0, 1, 2)] * 8
+        with self.assertRaises(RuntimeError):
+            generate_tree_reference(verts, faces)
+        aabb_tree = aabb.generate_tree(verts, faces, AabbSplit.CENTROID)
+        self.assertTrue(aabb.is_tree_valid(aabb_tree, len(faces)))
+        self.assertEqual(len(aabb_tree), 2 * len(faces) - 1)
+        self.assertEqual([node[8] for node in aabb_tree if node[8] != -1], list(range(len(faces))))
+
+    def test_empty_faces_raise(self):
+        with self.assertRaises(ValueError):
+            aabb.generate_tree([], [], AabbSplit.CENTROID)
+
+    def test_surface_area_split_has_lowest_cost(self):
+        rnd = random.Random(11)
+        for num_faces in (2, 3, 7, 20):
+            face_min = np.array([[rnd.uniform(-10.0, 10.0) for _ in range(3)] for _ in range(num_faces)])
+            face_max = face_min + np.array([[rnd.uniform(0.0, 3.0) for _ in range(3)] for _ in range(num_faces)])
+            centroids = (face_min + face_max) / 2.0
+            split_axis, left, right = aabb.split_by_surface_area(face_min, face_max, centroids)
+            self.assertIn(split_axis, (0, 1, 2))
+            self.assertEqual(sorted(np.concatenate((left, right)).tolist()), list(range(num_faces)))
+            self.assertTrue(len(left) > 0 and len(right) > 0)
+            expected_cost = split_by_surface_area_reference(face_min.tolist(), face_max.tolist(), centroids.tolist())
+            self.assertAlmostEqual(get_split_cost(face_min, face_max, left, right), expected_cost, places=9)
+
+    def test_trees_are_valid_and_bounded(self):
+        for split in (AabbSplit.CENTROID, AabbSplit.SAH):
+            for verts, faces in new_test_meshes():
+                aabb_tree = aabb.generate_tree(verts, faces, split)
+                self.assertTrue(aabb.is_tree_valid(aabb_tree, len(faces)))
+                assert_tree_bounds(self, aabb_tree, verts, faces)
+
+    def test_refit_to_same_faces_keeps_tree(self):
+        for verts, faces in new_test_meshes():
+            aabb_tree = aabb.generate_tree(verts, faces)
+            refitted = aabb.refit_tree(aabb_tree, verts, faces, range(len(faces)))
+            self.assertEqual(refitted, aabb_tree)
+
+    def test_refit_to_moved_vertices_and_reordered_faces(self):
+        rnd = random.Random(13)
+        for verts, faces in new_test_meshes():
+            aabb_tree = aabb.generate_tree(verts, faces)
+            new_verts = [(2.0 * x + 1.0, y - 3.0, -z) for x, y, z in verts]
+            order = list(range(len(faces)))
+            rnd.shuffle(order)
+            new_faces = [faces[face_idx] for face_idx in order]
+            new_face_by_old_face = {face_idx: new_idx for new_idx, face_idx in enumerate(order)}
+            refitted = aabb.refit_tree(aabb_tree, new_verts, new_faces, new_face_by_old_face)
+            self.assertTrue(aabb.is_tree_valid(refitted, len(faces)))
+            for node, refitted_node in zip(aabb_tree, refitted):
+                face_idx = node[8]
+                self.assertEqual(refitted_node[6:8], node[6:8])
+                self.assertEqual(refitted_node[8], new_face_by_old_face[face_idx] if face_idx != -1 else -1)
+                self.assertEqual(refitted_node[9], node[9])
+            assert_tree_bounds(self, refitted, new_verts, new_faces)
+
+    def test_tree_validity(self):
+        verts, faces = new_test_meshes()[1]
+        aabb_tree = aabb.generate_tree(verts, faces)
+        self.assertTrue(aabb.is_tree_valid(aabb_tree, len(faces)))
+        self.assertFalse(aabb.is_tree_valid(aabb_tree, len(faces) + 1))
+        self.assertFalse(aabb.is_tree_valid(aabb_tree, len(faces) - 1))
+
+        leaf_idx = next(node_idx for node_idx, node in enumerate(aabb_tree) if node[8] != -1)
+        duplicate_leaf = [list(node) for node in aabb_tree]
+        duplicate_leaf[leaf_idx][8] = (duplicate_leaf[leaf_idx][8] + 1) % len(faces)
+        self.assertFalse(aabb.is_tree_valid(duplicate_leaf, len(faces)))
+
+        # Children must follow their parent and lie within the tree
+        for child_idx in (0, len(aabb_tree)):
+            bad_child = [list(node) for node in aabb_tree]
+            bad_child[0][7] = child_idx
+            self.assertFalse(aabb.is_tree_valid(bad_child, len(faces)))
+
+        self.assertFalse(aabb.is_tree_valid([], len(faces)))
+
+
+if __name__ == "__main__":
+    unittest.main()
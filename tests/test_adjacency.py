@@ -0,0 +1,112 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import random
+import unittest
+
+from kotorblender import adjacency
+
+
+def get_face_edges(face):
+    return [tuple(sorted(edge)) for edge in [(face[0], face[1]), (face[1], face[2]), (face[2], face[0])]]
+
+
+def find_adjacent_edges_pairwise(faces):
+    # Pairwise edge comparison that BwmSaver.peek_edges used to perform
+    adjacent_edges = [[-1, -1, -1] for _ in range(len(faces))]
+    for face_idx, face in enumerate(faces):
+        edges = get_face_edges(face)
+        for other_face_idx in range(face_idx + 1, len(faces)):
+            other_edges = get_face_edges(faces[other_face_idx])
+            num_adj_edges = 0
+            for i in range(3):
+                if adjacent_edges[face_idx][i] != -1:
+                    num_adj_edges += 1
+                    continue
+                for j in range(3):
+                    if edges[i] == other_edges[j]:
+                        adjacent_edges[face_idx][i] = 3 * other_face_idx + j
+                        adjacent_edges[other_face_idx][j] = 3 * face_idx + i
+                        num_adj_edges += 1
+                        break
+            if num_adj_edges == 3:
+                break
+    return adjacent_edges
+
+
+def find_adjacent_faces_pairwise(faces):
+    # Pairwise edge comparison that MdlSaver used for face adjacencies
+    face_adjacencies = [[-1, -1, -1] for _ in range(len(faces))]
+    for face_idx, face in enumerate(faces):
+        edges = get_face_edges(face)
+        for other_face_idx in range(face_idx + 1, len(faces)):
+            other_edges = get_face_edges(faces[other_face_idx])
+            num_adj_faces = 0
+            for i in range(3):
+                if face_adjacencies[face_idx][i] != -1:
+                    num_adj_faces += 1
+                    continue
+                for j in range(3):
+                    if edges[i] == other_edges[j]:
+                        face_adjacencies[face_idx][i] = other_face_idx
+                        face_adjacencies[other_face_idx][j] = face_idx
+                        num_adj_faces += 1
+                        break
+            if num_adj_faces == 3:
+                break
+    return face_adjacencies
+
+
+def new_grid_faces(num_cols, num_rows):
+    faces = []
+    for row in range(num_rows):
+        for col in range(num_cols):
+            vert_idx = row * (num_cols + 1) + col
+            faces.append((vert_idx, vert_idx + 1, vert_idx + num_cols + 2))
+            faces.append((vert_idx, vert_idx + num_cols + 2, vert_idx + num_cols + 1))
+    return faces
+
+
+def new_test_meshes():
+    rnd = random.Random(5)
+    return [
+        [],
+        [(0, 1, 2)],
+        new_grid_faces(4, 3),
+        # Three faces sharing an edge, and a face with reversed winding
+        [(0, 1, 2), (1, 0, 3), (0, 1, 4), (2, 1, 0)],
+        # Degenerate and duplicate faces
+        [(0, 0, 1), (0, 1, 2), (1, 0, 0), (0, 1, 2), (2, 2, 2), (1, 2, 3)],
+        # Random faces over few vertices share many edges
+        [tuple(rnd.sample(range(6), 3)) for _ in range(40)],
+        [tuple(rnd.choice(range(5)) for _ in range(3)) for _ in range(40)]]
+
+
+class TestAdjacency(unittest.TestCase):
+
+    def test_adjacent_edges_match_pairwise(self):
+        for faces in new_test_meshes():
+            self.assertEqual(adjacency.find_adjacent_edges(faces), find_adjacent_edges_pairwise(faces))
+
+    def test_adjacent_faces_match_pairwise(self):
+        for faces in new_test_meshes():
+            self.assertEqual(adjacency.find_adjacent_faces(faces), find_adjacent_faces_pairwise(faces))
+
+
+if __name__ == "__main__":
+    unittest.main()
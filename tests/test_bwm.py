@@ -0,0 +1,87 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import os
+import random
+import tempfile
+import unittest
+
+from kotorblender.format.bwm.saver import MERGE_DISTANCE, BwmSaver
+from kotorblender.scene.modelnode.aabb import AabbNode
+from kotorblender.scene.walkmesh import Walkmesh
+
+from kotorblender import utils
+
+
+def weld_vertices_pairwise(verts, offset):
+    # Pairwise vertex weld that BwmSaver.peek_vertices used to perform
+    new_vert_by_old_vert = dict()
+    unique_verts = []
+    for vert_idx, vert in enumerate(verts):
+        if vert_idx in new_vert_by_old_vert:
+            continue
+        num_unique = len(unique_verts)
+        for other_vert_idx in range(vert_idx + 1, len(verts)):
+            if other_vert_idx in new_vert_by_old_vert:
+                continue
+            if utils.is_close_3(vert, verts[other_vert_idx], MERGE_DISTANCE):
+                new_vert_by_old_vert[other_vert_idx] = num_unique
+        unique_verts.append([vert[i] + offset[i] for i in range(3)])
+        new_vert_by_old_vert[vert_idx] = num_unique
+    return new_vert_by_old_vert, unique_verts
+
+
+def new_weld_test_verts():
+    rnd = random.Random(1)
+    base_verts = [(0.0, 0.0, 0.0), (1.0, -1.0, 0.0), (-250.5, 12.25, 3.0), (1e-9, 0.0, -1e-9)]
+    base_verts.extend((rnd.uniform(-50.0, 50.0), rnd.uniform(-50.0, 50.0), rnd.choice([0.0, rnd.uniform(-5.0, 5.0)])) for _ in range(60))
+    verts = []
+    for vert in base_verts:
+        verts.append(vert)
+        # Exact duplicate, relatively close, and barely not close copies
+        for scale in rnd.sample([1.0, 1.0 + 0.5 * MERGE_DISTANCE, 1.0 - 0.9 * MERGE_DISTANCE, 1.0 + 3.0 * MERGE_DISTANCE], 2):
+            verts.append(tuple(scale * val for val in vert))
+    # Vertices close on one axis only, and the negated copy of a vertex
+    verts.append((verts[5][0], verts[5][1] + 1.0, verts[5][2]))
+    verts.append(tuple(-val for val in verts[7]))
+    rnd.shuffle(verts)
+    return verts
+
+
+class TestBwmVertexWeld(unittest.TestCase):
+
+    def test_matches_pairwise_weld(self):
+        node = AabbNode("walkmesh")
+        node.verts = new_weld_test_verts()
+        node.position = (1.0, 2.0, 3.0)
+        node.lytposition = (100.0, -50.0, 0.5)
+        offset = [node.position[i] + node.lytposition[i] for i in range(3)]
+        expected_mapping, expected_verts = weld_vertices_pairwise(node.verts.tolist(), offset)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            saver = BwmSaver(os.path.join(tmpdir, "walkmesh.wok"), Walkmesh.from_aabb_node(node))
+        saver.geom_node = node
+        saver.peek_vertices()
+
+        self.assertEqual(saver.new_vert_by_old_vert, expected_mapping)
+        self.assertLess(len(expected_verts), len(node.verts))
+        self.assertEqual(saver.verts.tolist(), expected_verts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,344 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import os
+import random
+import tempfile
+import unittest
+
+from math import sqrt
+
+import numpy as np
+
+from mathutils import Matrix
+
+from kotorblender.defines import AabbSplit, Classification
+from kotorblender.format.mdl.loader import MdlLoader
+from kotorblender.format.mdl.saver import MdlSaver
+from kotorblender.scene.model import Model
+from kotorblender.scene.modelnode.aabb import AabbNode
+from kotorblender.scene.modelnode.dummy import DummyNode
+from kotorblender.scene.modelnode.skinmesh import SkinmeshNode
+from kotorblender.scene.modelnode.trimesh import TrimeshNode
+
+from kotorblender import aabb
+
+
+def new_model(name, classification):
+    model = Model()
+    model.name = name
+    model.classification = classification
+    model.animroot = name
+    model.root_node = DummyNode(name)
+    return model
+
+
+def add_node(node, parent):
+    node.parent = parent
+    node.from_root = Matrix()
+    parent.children.append(node)
+    return node
+
+
+def assign_node_numbers(model):
+    nodes = [model.root_node]
+    for node_number, node in enumerate(nodes):
+        node.node_number = node_number
+        nodes.extend(node.children)
+
+
+def new_skin_model():
+    model = new_model("skinmdl", Classification.CHARACTER)
+    root = model.root_node
+    add_node(DummyNode("bone1"), root)
+    add_node(DummyNode("bone2"), root)
+    add_node(DummyNode("unused"), root)
+    skin = add_node(SkinmeshNode("skin"), root)
+    skin.verts = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0), (0.0, 1.0, 0.0)]
+    skin.normals = [(0.0, 0.0, 1.0)] * 4
+    skin.uv1 = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]
+    skin.facelist.vertices = [(0, 1, 2), (0, 2, 3)]
+    skin.facelist.materials = [0, 0]
+    skin.facelist.normals = [(0.0, 0.0, 1.0)] * 2
+    skin.weights = [
+        [["bone1", 1.0]],
+        [["bone1", 0.75], ["bone2", 0.25]],
+        [["bone2", 1.0]],
+        [["bone1", 0.5], ["bone2", 0.5]]]
+    assign_node_numbers(model)
+    return model
+
+
+def new_aabb_model():
+    model = new_model("aabbmdl", Classification.TILE)
+    walkmesh = add_node(AabbNode("walkmesh"), model.root_node)
+    size = 4
+    walkmesh.verts = [(0.5 * col, 0.25 * row, 0.125 * ((row * col) % 3)) for row in range(size + 1) for col in range(size + 1)]
+    walkmesh.normals = [(0.0, 0.0, 1.0)] * len(walkmesh.verts)
+    walkmesh.uv1 = [(col / size, row / size) for row in range(size + 1) for col in range(size + 1)]
+    faces = []
+    for row in range(size):
+        for col in range(size):
+            vert_idx = row * (size + 1) + col
+            faces.append((vert_idx, vert_idx + 1, vert_idx + size + 2))
+            faces.append((vert_idx, vert_idx + size + 2, vert_idx + size + 1))
+    walkmesh.facelist.vertices = faces
+    walkmesh.facelist.materials = [1] * len(faces)
+    walkmesh.facelist.normals = [(0.0, 0.0, 1.0)] * len(faces)
+    assign_node_numbers(model)
+    return model
+
+
+def compress_vector_xbox(vec):
+    # Per-vector compression that MdlSaver used to perform
+    x, y, z = vec
+    if abs(x) > 1.0 or abs(y) > 1.0 or abs(z) > 1.0:
+        return 0
+
+    tmp = round(511.0 * z)
+    if z < 0.0:
+        tmp = 1023 + tmp
+    comp = tmp
+
+    tmp = round(1023.0 * y)
+    if y < 0.0:
+        tmp = 2047 + tmp
+    comp = (comp << 11) | tmp
+
+    tmp = round(1023.0 * x)
+    if x < 0.0:
+        tmp = 2047 + tmp
+    comp = (comp << 11) | tmp
+
+    return comp
+
+
+def decompress_vector_xbox(comp):
+    # Per-vector decompression that MdlLoader used to perform
+    tmp = comp & 0x7ff
+    x = tmp / 1023.0 if tmp < 1024 else (tmp - 2047) / 1023.0
+
+    tmp = (comp >> 11) & 0x7ff
+    y = tmp / 1023.0 if tmp < 1024 else (tmp - 2047) / 1023.0
+
+    tmp = comp >> 22
+    z = tmp / 511.0 if tmp < 512 else (tmp - 1023) / 511.0
+
+    return (x, y, z)
+
+
+def calculate_face_area(face_verts):
+    # Per-face area that MdlSaver used to compute
+    a, b, c = [sqrt(sum((face_verts[j][k] - face_verts[i][k]) ** 2 for k in range(3))) for i, j in [(0, 1), (0, 2), (1, 2)]]
+    s = (a + b + c) / 2.0
+    if a <= 0.0 or b <= 0.0 or c <= 0.0:
+        return -1.0
+    if a > b + c or b > a + c or c > a + b:
+        return -1.0
+    return sqrt(s * (s - a) * (s - b) * (s - c))
+
+
+def calculate_mesh_stats(verts, faces):
+    # Per-corner bounding box, average, total area and radius that MdlSaver
+    # used to compute
+    bb_min = [0.0] * 3
+    bb_max = [0.0] * 3
+    average = [0.0] * 3
+    total_area = 0.0
+    for face in faces:
+        face_verts = [verts[vert_idx] for vert_idx in face]
+        for vert in face_verts:
+            bb_min = [min(bb_min[k], vert[k]) for k in range(3)]
+            bb_max = [max(bb_max[k], vert[k]) for k in range(3)]
+            average = [average[k] + vert[k] for k in range(3)]
+        area = calculate_face_area(face_verts)
+        if area != 1.0:
+            total_area += area
+    average = [val / (3 * len(faces)) for val in average]
+    radius = 0.0
+    for face in faces:
+        for vert_idx in face:
+            radius = max(radius, sqrt(sum((verts[vert_idx][k] - average[k]) ** 2 for k in range(3))))
+    return [*bb_min, *bb_max], average, total_area, radius
+
+
+def save_and_load(model, path, xbox=False, load_aabb_trees=True):
+    MdlSaver(path, model, tsl=False, xbox=xbox).save()
+    return MdlLoader(path, load_aabb_trees).load()
+
+
+def read_model_files(path):
+    contents = []
+    for ext in (".mdl", ".mdx"):
+        with open(path[:-4] + ext, "rb") as f:
+            contents.append(f.read())
+    return contents
+
+
+class TestMdlSkinWeights(unittest.TestCase):
+
+    def assert_round_trip(self, xbox):
+        model = new_skin_model()
+        expected = model.root_node.children[-1].weights
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "skinmdl.mdl")
+            loaded = save_and_load(model, path, xbox)
+            resaved_path = os.path.join(tmpdir, "resaved", "skinmdl.mdl")
+            os.mkdir(os.path.dirname(resaved_path))
+            MdlSaver(resaved_path, loaded, tsl=False, xbox=xbox).save()
+            self.assertEqual(read_model_files(resaved_path), read_model_files(path))
+        skin = loaded.find_node(lambda node: node.name == "skin")
+        self.assertEqual(len(skin.weights), len(expected))
+        for vert_weights, expected_weights in zip(skin.weights, expected):
+            self.assertEqual([name for name, _ in vert_weights], [name for name, _ in expected_weights])
+            for (_, weight), (_, expected_weight) in zip(vert_weights, expected_weights):
+                self.assertAlmostEqual(weight, expected_weight, places=5)
+
+    def test_pc_round_trip(self):
+        self.assert_round_trip(xbox=False)
+
+    def test_xbox_round_trip(self):
+        self.assert_round_trip(xbox=True)
+
+
+class TestMdlAabbTree(unittest.TestCase):
+
+    def test_loaded_tree_matches_generated_tree(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            loaded = save_and_load(new_aabb_model(), os.path.join(tmpdir, "aabbmdl.mdl"))
+        walkmesh = loaded.find_node(lambda node: node.name == "walkmesh")
+        expected_tree = aabb.generate_tree(walkmesh.verts, walkmesh.facelist.vertices)
+        self.assertEqual(len(walkmesh.aabb_tree), len(expected_tree))
+        for node, expected_node in zip(walkmesh.aabb_tree, expected_tree):
+            self.assertEqual(node[6:], expected_node[6:])
+            for val, expected_val in zip(node[:6], expected_node[:6]):
+                self.assertAlmostEqual(val, expected_val, places=6)
+
+    def test_loaded_tree_is_reused(self):
+        # Trees are saved with one split mode and re-saved with another, so
+        # that only a reused tree gives the same files
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "aabbmdl.mdl")
+            MdlSaver(path, new_aabb_model(), tsl=False, xbox=False, aabb_split=AabbSplit.SAH).save()
+            expected = read_model_files(path)
+            for load_aabb_trees in (True, False):
+                loaded = MdlLoader(path, load_aabb_trees).load()
+                walkmesh = loaded.find_node(lambda node: node.name == "walkmesh")
+                self.assertEqual(bool(walkmesh.aabb_tree), load_aabb_trees)
+                resaved_path = os.path.join(tmpdir, str(load_aabb_trees), "aabbmdl.mdl")
+                os.mkdir(os.path.dirname(resaved_path))
+                MdlSaver(resaved_path, loaded, tsl=False, xbox=False, aabb_split=AabbSplit.CENTROID).save()
+                if load_aabb_trees:
+                    self.assertEqual(read_model_files(resaved_path), expected)
+                else:
+                    self.assertNotEqual(read_model_files(resaved_path), expected)
+
+class TestXboxVectorCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "skinmdl.mdl")
+        self.saver = MdlSaver(path, new_skin_model(), tsl=False, xbox=True)
+        self.saver.save()
+        self.loader = MdlLoader(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_compression_matches_per_vector(self):
+        rnd = random.Random(17)
+        steps = [-1.0, -0.5, -0.0, 0.0, 0.5, 1.0]
+        vecs = [(x, y, z) for x in steps for y in steps for z in steps]
+        # Values halfway between steps, which round to even
+        vecs.extend(((k + 0.5) / 1023.0, -(k + 0.5) / 1023.0, (k + 0.5) / 511.0) for k in range(0, 511, 7))
+        # Vectors outside of [-1, 1] are compressed to zero
+        vecs.extend([(1.0001, 0.0, 0.0), (0.0, -2.0, 0.5), (0.25, 0.25, 1.5)])
+        vecs.extend(tuple(rnd.uniform(-1.0, 1.0) for _ in range(3)) for _ in range(200))
+        comps = self.saver.compress_vectors_xbox(vecs)
+        self.assertEqual(comps.dtype, np.uint32)
+        self.assertEqual(comps.tolist(), [compress_vector_xbox(vec) for vec in vecs])
+
+    def test_decompression_matches_per_vector(self):
+        comps = list(range(0, 1 << 32, 65537)) + [0x7ff, 0x3ff, 0x400, 0x7ff << 11, 511 << 22, 512 << 22, 0xffffffff]
+        vecs = self.loader.decompress_vectors_xbox(np.array(comps, dtype=np.uint32))
+        self.assertEqual(vecs.tolist(), [list(decompress_vector_xbox(comp)) for comp in comps])
+
+    def test_round_trip_error_is_bounded(self):
+        rnd = random.Random(19)
+        vecs = np.array([[rnd.uniform(-1.0, 1.0) for _ in range(3)] for _ in range(500)])
+        decompressed = self.loader.decompress_vectors_xbox(self.saver.compress_vectors_xbox(vecs))
+        self.assertTrue(np.all(np.abs(decompressed - vecs) <= np.array([0.5 / 1023.0, 0.5 / 1023.0, 0.5 / 511.0]) + 1e-12))
+
+
+class TestMdlMeshStats(unittest.TestCase):
+
+    def test_face_areas_match_per_face(self):
+        rnd = random.Random(23)
+        faces = [
+            [(0.0, 0.0, 0.0), (2.0, 0.0, 0.0), (0.0, 1.0, 0.0)],
+            [(1.0, 1.0, 1.0), (1.0, 1.0, 1.0), (2.0, 0.0, 0.0)],
+            [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (2.0, 0.0, 0.0)],
+            [(-3.0, 2.0, 0.5), (4.0, -1.0, 2.0), (0.0, 5.0, -2.0)]]
+        faces.extend([[rnd.uniform(-10.0, 10.0) for _ in range(3)] for _ in range(3)] for _ in range(100))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            saver = MdlSaver(os.path.join(tmpdir, "skinmdl.mdl"), new_skin_model(), tsl=False, xbox=False)
+        areas = saver.calculate_face_areas(np.array(faces))
+        self.assertEqual(len(areas), len(faces))
+        for area, face_verts in zip(areas.tolist(), faces):
+            self.assertAlmostEqual(area, calculate_face_area(face_verts), places=9)
+
+    def test_mesh_stats_match_per_corner(self):
+        rnd = random.Random(29)
+        model = new_model("statsmdl", Classification.OTHER)
+        meshes = []
+        for name, offset in [("mesh1", (0.0, 0.0, 0.0)), ("mesh2", (5.0, 3.0, 1.0)), ("mesh3", (-8.0, -2.0, -4.0))]:
+            mesh = add_node(TrimeshNode(name), model.root_node)
+            mesh.verts = [tuple(offset[k] + rnd.uniform(-1.0, 1.0) for k in range(3)) for _ in range(12)]
+            mesh.normals = [(0.0, 0.0, 1.0)] * len(mesh.verts)
+            mesh.uv1 = [(0.0, 0.0)] * len(mesh.verts)
+            # Unused vertices do not count, degenerate faces do
+            mesh.facelist.vertices = [tuple(rnd.sample(range(10), 3)) for _ in range(15)] + [(0, 0, 1)]
+            mesh.facelist.materials = [0] * len(mesh.facelist.vertices)
+            mesh.facelist.normals = [(0.0, 0.0, 1.0)] * len(mesh.facelist.vertices)
+            meshes.append(mesh)
+        empty_mesh = add_node(TrimeshNode("empty"), model.root_node)
+        assign_node_numbers(model)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            saver = MdlSaver(os.path.join(tmpdir, "statsmdl.mdl"), model, tsl=False, xbox=False)
+            saver.save()
+        for mesh in meshes:
+            node_idx = saver.nodes.index(mesh)
+            bounding_box, average, total_area, radius = calculate_mesh_stats(mesh.verts.tolist(), mesh.facelist.vertices.tolist())
+            for val, expected_val in zip(saver.mesh_bounding_boxes[node_idx], bounding_box):
+                self.assertAlmostEqual(val, expected_val, places=9)
+            for val, expected_val in zip(saver.mesh_averages[node_idx], average):
+                self.assertAlmostEqual(val, expected_val, places=9)
+            self.assertAlmostEqual(saver.mesh_total_areas[node_idx], total_area, places=9)
+            self.assertAlmostEqual(saver.mesh_radii[node_idx], radius, places=9)
+
+        # Meshes without faces get zero statistics
+        node_idx = saver.nodes.index(empty_mesh)
+        self.assertEqual(saver.mesh_bounding_boxes[node_idx], [0.0] * 6)
+        self.assertEqual(saver.mesh_averages[node_idx], [0.0] * 3)
+        self.assertEqual(saver.mesh_total_areas[node_idx], 0.0)
+        self.assertEqual(saver.mesh_radii[node_idx], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
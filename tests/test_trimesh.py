@@ -0,0 +1,154 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import random
+import unittest
+
+from math import cos, radians, sqrt
+
+from kotorblender.scene.modelnode.trimesh import MERGE_DISTANCE, MERGE_DISTANCE_UV, TrimeshNode
+
+from kotorblender import utils
+
+
+def cos_angle_between(a, b):
+    len2_a = sum([a[i] * a[i] for i in range(3)])
+    if len2_a == 0.0:
+        return -1.0
+    len2_b = sum([b[i] * b[i] for i in range(3)])
+    if len2_b == 0.0:
+        return -1.0
+    dot = sum([a[i] * b[i] for i in range(3)])
+    return dot / sqrt(len2_a * len2_b)
+
+
+def merge_similar_vertices_pairwise(verts, normals, uv1, uv2, faces, sharp_edge_angle):
+    # Pairwise vertex comparison that TrimeshNode.merge_similar_vertices used
+    # to perform
+    new_idx_by_old_idx = dict()
+    unique_indices = []
+    split_normals = []
+    for vert_idx, vert in enumerate(verts):
+        if vert_idx in new_idx_by_old_idx:
+            continue
+        num_unique = len(unique_indices)
+        vert_normals = [normals[vert_idx]]
+        for other_vert_idx in range(vert_idx + 1, len(verts)):
+            if other_vert_idx in new_idx_by_old_idx:
+                continue
+            if (utils.is_close_3(vert, verts[other_vert_idx], MERGE_DISTANCE) and
+                    ((not uv1) or utils.is_close_2(uv1[vert_idx], uv1[other_vert_idx], MERGE_DISTANCE_UV)) and
+                    ((not uv2) or utils.is_close_2(uv2[vert_idx], uv2[other_vert_idx], MERGE_DISTANCE_UV)) and
+                    cos_angle_between(normals[vert_idx], normals[other_vert_idx]) > 0.5):
+                new_idx_by_old_idx[other_vert_idx] = num_unique
+                vert_normals.append(normals[other_vert_idx])
+        new_idx_by_old_idx[vert_idx] = num_unique
+        unique_indices.append(vert_idx)
+        split_normals.append(vert_normals)
+
+    merged_normals = []
+    sharp_verts = []
+    cos_angle_sharp = cos(sharp_edge_angle)
+    for vert_normals in split_normals:
+        normal = [sum(n[i] for n in vert_normals) for i in range(3)]
+        length = sqrt(sum(val * val for val in normal))
+        merged_normals.append([val / length for val in normal] if length > 0.0 else normal)
+        sharp_verts.append(any(cos_angle_between(a, b) < cos_angle_sharp
+                               for normal_idx, a in enumerate(vert_normals)
+                               for b in vert_normals[normal_idx + 1:]))
+
+    new_faces = [[new_idx_by_old_idx[vert_idx] for vert_idx in face] for face in faces]
+    sharp_edges = set()
+    for face in new_faces:
+        for edge in [tuple(sorted(pair)) for pair in [(face[0], face[1]), (face[1], face[2]), (face[2], face[0])]]:
+            if sharp_verts[edge[0]] and sharp_verts[edge[1]]:
+                sharp_edges.add(edge)
+
+    return ([verts[i] for i in unique_indices],
+            merged_normals,
+            [uv1[i] for i in unique_indices] if uv1 else [],
+            [uv2[i] for i in unique_indices] if uv2 else [],
+            new_faces,
+            sharp_edges)
+
+
+def new_test_mesh(with_uv2):
+    # Faces of a bumpy grid with separate corners, as exported from Blender,
+    # so that corners of neighbouring faces are merged unless their normals
+    # or UV differ
+    rnd = random.Random(3)
+    size = 5
+    heights = [[rnd.choice([0.0, 0.0, 1.0]) for _ in range(size + 1)] for _ in range(size + 1)]
+    verts, normals, uv1, uv2, faces = [], [], [], [], []
+    for row in range(size):
+        for col in range(size):
+            corners = [(col, row), (col + 1, row), (col + 1, row + 1), (col, row + 1)]
+            for tri in [(0, 1, 2), (0, 2, 3)]:
+                face = []
+                normal = rnd.choice([(0.0, 0.0, 1.0), (0.0, 0.0, 1.0), (0.6, 0.0, 0.8), (1.0, 0.0, 0.0), (0.0, 0.0, -1.0)])
+                for corner in tri:
+                    x, y = corners[corner]
+                    face.append(len(verts))
+                    verts.append((float(x), float(y), heights[y][x] * (1.0 + rnd.choice([0.0, 0.0, 0.5, 3.0]) * MERGE_DISTANCE)))
+                    normals.append(normal)
+                    # UV seam along the middle column
+                    uv1.append((x / size + (0.5 if col >= size // 2 else 0.0), y / size))
+                    uv2.append((y / size, x / size))
+                faces.append(face)
+    return verts, normals, uv1, uv2 if with_uv2 else [], faces
+
+
+class TestTrimeshMergeSimilarVertices(unittest.TestCase):
+
+    def assert_matches_pairwise(self, with_uv2):
+        verts, normals, uv1, uv2, faces = new_test_mesh(with_uv2)
+        sharp_edge_angle = radians(30.0)
+        node = TrimeshNode("mesh")
+        node.verts = verts
+        node.normals = normals
+        node.uv1 = uv1
+        node.uv2 = uv2
+        node.facelist.vertices = faces
+
+        # Compare against values as stored by the node
+        expected = merge_similar_vertices_pairwise(node.verts.tolist(), node.normals.tolist(),
+                                                   node.uv1.tolist(), node.uv2.tolist(),
+                                                   faces, sharp_edge_angle)
+        node.merge_similar_vertices(sharp_edge_angle)
+
+        expected_verts, expected_normals, expected_uv1, expected_uv2, expected_faces, expected_sharp_edges = expected
+        self.assertLess(len(node.verts), len(verts))
+        self.assertEqual(node.verts.tolist(), expected_verts)
+        self.assertEqual(len(node.normals), len(expected_normals))
+        for normal, expected_normal in zip(node.normals, expected_normals):
+            for val, expected_val in zip(normal, expected_normal):
+                self.assertAlmostEqual(val, expected_val, places=5)
+        self.assertEqual(node.uv1.tolist(), expected_uv1)
+        self.assertEqual(node.uv2.tolist(), expected_uv2)
+        self.assertEqual(node.facelist.vertices.tolist(), expected_faces)
+        self.assertEqual(node.sharp_edges, expected_sharp_edges)
+
+    def test_matches_pairwise(self):
+        self.assert_matches_pairwise(with_uv2=True)
+
+    def test_matches_pairwise_without_uv2(self):
+        self.assert_matches_pairwise(with_uv2=False)
+
+
+if __name__ == "__main__":
+    unittest.main()